@@ -0,0 +1,396 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+from scipy.optimize import brentq
+
+from Option import Options
+from Provider import SyntheticProvider
+
+# dependencies that must not be imported before the GUI window shows up
+HEAVY_MODULES = ['scipy', 'pandas', 'matplotlib', 'pandastable', 'yfinance', 'bs4', 'requests', 'lxml']
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def synthetic_quotes(n: int, seed: int = 0) -> dict:
+    """
+    Random but reproducible option quotes priced with the BSM formulas
+    :param n: number of quotes
+    :param seed: seed of the random generator
+    :return: dict of arrays (strike, spot, t, sigma, is_call, price)
+    """
+    rng = np.random.default_rng(seed)
+    quotes = {
+        'strike': rng.uniform(50, 150, n),
+        'spot': np.full(n, 100.0),
+        't': rng.uniform(0.05, 3, n),
+        'sigma': rng.uniform(0.05, 1.0, n),
+        'is_call': rng.random(n) < 0.5
+    }
+    quotes['price'] = Options(quotes['strike'], quotes['spot'], quotes['t'], quotes['sigma']).greeks(
+        quotes['is_call']).price
+    return quotes
+
+
+def scalar_pricing(quotes: dict):
+    """
+    One Options object per contract, as the portfolio run used to do
+    """
+    for i in range(len(quotes['strike'])):
+        option_type = 'CALL' if quotes['is_call'][i] else 'PUT'
+        op = Options(quotes['strike'][i], quotes['spot'][i], quotes['t'][i], quotes['sigma'][i])
+        op.bsm(option_type), op.delta(option_type), op.gamma(), op.vega(), op.theta(option_type)
+
+
+def batch_pricing(quotes: dict):
+    Options(quotes['strike'], quotes['spot'], quotes['t'], quotes['sigma']).greeks(quotes['is_call'])
+
+
+def scalar_implied_vol(quotes: dict):
+    """
+    Per-contract Brent solver on the BSM price
+    """
+    for i in range(len(quotes['strike'])):
+        option_type = 'CALL' if quotes['is_call'][i] else 'PUT'
+        try:
+            brentq(lambda s: Options(quotes['strike'][i], quotes['spot'][i], quotes['t'][i], s).greeks(
+                option_type).price - quotes['price'][i], 1e-6, 5.0, xtol=1e-10)
+        except ValueError:
+            continue
+
+
+def batch_implied_vol(quotes: dict):
+    Options.implied_volatility(quotes['price'], quotes['strike'], quotes['spot'], quotes['t'], quotes['is_call'])
+
+
+def parallel_pricing(workers: int):
+    """
+    :param workers: number of processes
+    :return: benchmark function pricing the quotes with a ParallelPricer (pool start-up included)
+    """
+    def run(quotes: dict):
+        from Parallel import ParallelPricer
+
+        ParallelPricer(workers=workers).greeks(quotes['strike'], quotes['spot'], quotes['t'], quotes['sigma'],
+                                               quotes['is_call'])
+    return run
+
+
+def tree_pricing(method: str):
+    """
+    :param method: CRR or LR
+    :return: benchmark function pricing the quotes (price and Greeks) with a 500 steps American binomial tree
+    """
+    def run(quotes: dict):
+        from Lattice import BinomialTree
+
+        BinomialTree(steps=500, method=method).greeks(quotes['strike'], quotes['spot'], quotes['t'], quotes['sigma'],
+                                                      quotes['is_call'])
+    return run
+
+
+def tree_accuracy(n: int = 1_000, steps: tuple = (50, 100, 200, 500, 1000)) -> list:
+    """
+    Convergence of the European binomial trees to the BSM price, and early exercise premium of the American trees
+    :param n: number of quotes
+    :param steps: numbers of time steps
+    :return: list of dict (method, steps, seconds, max and root mean square error against BSM, mean premium)
+    """
+    from Lattice import METHODS, BinomialTree
+
+    quotes = synthetic_quotes(n)
+    args = quotes['strike'], quotes['spot'], quotes['t'], quotes['sigma'], quotes['is_call']
+    results = []
+    for method in METHODS:
+        for m in steps:
+            start = time.perf_counter()
+            european = BinomialTree(m, method, american=False).price(*args)
+            seconds = time.perf_counter() - start
+            american = BinomialTree(m, method).price(*args)
+            error = european - quotes['price']
+            results.append({'method': method, 'steps': m, 'seconds': seconds, 'max_error': float(np.abs(error).max()),
+                            'rmse': float(np.sqrt(np.mean(error ** 2))),
+                            'premium': float(np.mean(american - european))})
+    return results
+
+
+def mc_pricing(workers: int):
+    """
+    :param workers: number of processes
+    :return: benchmark function pricing one European call with n Monte Carlo paths (antithetic, control variate)
+    """
+    def run(n: int):
+        from MonteCarlo import MonteCarloPricer
+
+        MonteCarloPricer(paths=n + n % 2, workers=workers).price(100.0, 105.0, 0.7, 0.25, 'CALL')
+    return run
+
+
+def mc_validation(paths: int = 200_000, seeds: int = 20) -> list:
+    """
+    Monte Carlo against the BSM price, with and without variance reduction, over independent seeds
+    :param paths: number of paths per estimate
+    :param seeds: number of estimates (seeds 0 to seeds - 1)
+    :return: list of dict (option type, variance reduction, mean standard error, mean z-score, share of the
+    confidence intervals containing the BSM price, paths/s)
+    """
+    from MonteCarlo import MonteCarloPricer
+
+    results = []
+    for option_type in ('CALL', 'PUT'):
+        bsm = float(Options(100.0, 105.0, 0.7, 0.25).greeks(option_type).price)
+        for name, antithetic, control in [('none', False, False), ('antithetic', True, False),
+                                          ('antithetic+control', True, True)]:
+            runs = [MonteCarloPricer(paths=paths, antithetic=antithetic, control_variate=control, seed=seed).price(
+                100.0, 105.0, 0.7, 0.25, option_type) for seed in range(seeds)]
+            results.append({'type': option_type, 'reduction': name, 'bsm': bsm,
+                            'std_error': float(np.mean([r.std_error for r in runs])),
+                            'z': float(np.mean([(r.price - bsm) / r.std_error for r in runs])),
+                            'coverage': float(np.mean([r.ci_low <= bsm <= r.ci_high for r in runs])),
+                            'paths_per_s': float(np.median([r.paths_per_s for r in runs]))})
+    return results
+
+
+def cached_quotes(n: int) -> dict:
+    """
+    Synthetic quotes and a pricing cache already holding all of them (warm cache)
+    """
+    from Memo import PricingCache
+
+    quotes = synthetic_quotes(n)
+    quotes['cache'] = PricingCache(max_size=n)
+    cached_pricing(quotes)
+    return quotes
+
+
+def cached_pricing(quotes: dict):
+    quotes['cache'].greeks_batch(quotes['strike'], quotes['spot'], quotes['t'], quotes['sigma'], quotes['is_call'])
+
+
+def portfolio_run(portfolio):
+    from Interface import Main
+
+    Main.price_portfolio(portfolio)
+
+
+def chain_provider(n: int) -> tuple:
+    """
+    :return: synthetic provider with about n contracts over all its chains (12 maturities x 100 options per ticker)
+    and its tickers
+    """
+    provider = SyntheticProvider(n_tickers=max(1, -(-n // 1200)), seed=0)
+    return provider, provider.retrieve_ticker()
+
+
+def chain_ingestion(data: tuple):
+    from Option import Options
+
+    provider, stock_price = data
+    Options.get_option(stock_price, provider=provider, full_chain=True)
+
+
+def excel_export(portfolio):
+    from Interface import Main
+
+    Main.generate_excel(portfolio)
+
+
+def option_chart(_):
+    from Option import Chart
+
+    Chart.option_chart()
+
+
+def startup(_):
+    """
+    Fresh interpreter importing the GUI modules, what runs before the window is created
+    """
+    subprocess.run([sys.executable, '-c', 'import Interface'], cwd=PACKAGE_DIR, check=True)
+
+
+def startup_modules() -> list:
+    """
+    :return: heavy dependencies imported at the GUI startup (should be empty, they are loaded on first use)
+    """
+    out = subprocess.run([sys.executable, '-c', "import sys, Interface; print(' '.join(sys.modules))"],
+                         cwd=PACKAGE_DIR, capture_output=True, text=True, check=True)
+    loaded = set(out.stdout.split())
+    return [m for m in HEAVY_MODULES if m in loaded]
+
+
+class BenchmarkSuite:
+    """
+    Time, throughput and peak memory of the pricing, Greeks, chart and export paths
+    Attributes
+    ==========
+    sizes: numbers of contracts
+    repeat: number of timed runs, the best one is kept
+    scalar_max: largest size run through the scalar (one object per contract) paths
+    export_max: largest size run through the Excel export
+    workers: largest number of processes of the parallel pricing scaling cases (1, 2, 4... workers)
+    parallel_min: smallest size run through the parallel pricing
+    tree_max: largest size run through the binomial trees
+
+    """
+
+    def __init__(self, sizes: list = None, repeat: int = 3, scalar_max: int = 10_000, export_max: int = 100_000,
+                 workers: int = None, parallel_min: int = 100_000, tree_max: int = 10_000):
+        self.sizes = sizes or [10 ** k for k in range(2, 8)]
+        self.repeat = repeat
+        self.scalar_max = scalar_max
+        self.export_max = export_max
+        self.workers = workers or os.cpu_count()
+        self.parallel_min = parallel_min
+        self.tree_max = tree_max
+        self.results = []
+        self.accuracy = []
+        self.validation = []
+
+        # private
+        self._provider = SyntheticProvider(seed=0)
+
+    def cases(self) -> list:
+        """
+        :return: list of (name, function, setup, sizes), function is called on setup(size)
+        """
+        small = [n for n in self.sizes if n <= self.scalar_max]
+        large = [n for n in self.sizes if n >= self.parallel_min]
+        workers = sorted({min(2 ** k, self.workers) for k in range(self.workers.bit_length() + 1)})
+        return [
+            ('pricing_scalar', scalar_pricing, synthetic_quotes, small),
+            ('pricing_batch', batch_pricing, synthetic_quotes, self.sizes),
+            ('pricing_crr', tree_pricing('CRR'), synthetic_quotes, [n for n in self.sizes if n <= self.tree_max]),
+            ('pricing_lr', tree_pricing('LR'), synthetic_quotes, [n for n in self.sizes if n <= self.tree_max]),
+            *[(f'monte_carlo_{w}w', mc_pricing(w), lambda n: n, [n for n in self.sizes if n >= 10_000])
+              for w in sorted({1, self.workers})],
+            ('pricing_cached', cached_pricing, cached_quotes, [n for n in self.sizes if n <= self.export_max]),
+            *[(f'pricing_parallel_{w}w', parallel_pricing(w), synthetic_quotes, large) for w in workers],
+            ('implied_vol_scalar', scalar_implied_vol, synthetic_quotes, [n for n in small if n <= 1_000]),
+            ('implied_vol_batch', batch_implied_vol, synthetic_quotes, self.sizes),
+            ('run_bsm_ptf', portfolio_run, self._provider.portfolio, self.sizes),
+            ('full_chain', chain_ingestion, chain_provider, [n for n in self.sizes if 1_000 <= n <= self.export_max]),
+            ('generate_excel', excel_export, self._provider.portfolio, [n for n in self.sizes if n <= self.export_max]),
+            ('option_chart', option_chart, lambda n: None, [1]),
+            ('startup', startup, lambda n: None, [1])
+        ]
+
+    def measure(self, name: str, func, data, n: int) -> dict:
+        """
+        :return: best time of the repeated runs, throughput and peak memory of one traced run
+        """
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            func(data)
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        func(data)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        seconds = min(timings)
+        return {'name': name, 'n': n, 'seconds': seconds, 'throughput': n / seconds if seconds else float('inf'),
+                'peak_mb': peak / 2 ** 20}
+
+    def run(self, only: list = None) -> list:
+        """
+        Run every case (or only the named ones) in a temporary folder, the files written by the chart and the
+        export do not end up in the working directory
+        :param only: names of the cases to run
+        :return: list of results
+        """
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                for name, func, setup, sizes in self.cases():
+                    if only and name not in only:
+                        continue
+                    for n in sizes:
+                        res = self.measure(name, func, setup(n), n)
+                        self.results.append(res)
+                        print(f"{name:<20}{n:>10}  {res['seconds']:10.4f}s  {res['throughput']:14,.0f}/s  "
+                              f"{res['peak_mb']:10.1f} MB")
+                if not only or 'tree_accuracy' in only:
+                    self.accuracy = tree_accuracy()
+                    for a in self.accuracy:
+                        print(f"tree_accuracy {a['method']:<4}{a['steps']:>6} steps  {a['seconds']:8.4f}s  "
+                              f"max error {a['max_error']:.2e}  rmse {a['rmse']:.2e}  "
+                              f"American premium {a['premium']:.4f}")
+                if not only or 'mc_validation' in only:
+                    self.validation = mc_validation()
+                    for v in self.validation:
+                        print(f"mc_validation {v['type']:<5}{v['reduction']:<20} se {v['std_error']:.2e}  "
+                              f"mean z {v['z']:+.2f}  coverage {v['coverage']:.0%}  {v['paths_per_s']:12,.0f} paths/s")
+            finally:
+                os.chdir(cwd)
+        return self.results
+
+    def save(self, path: str):
+        """
+        :param path: json file with the machine, the date and the results
+        """
+        with open(path, 'w') as f:
+            json.dump({'date': datetime.now().isoformat(), 'python': sys.version, 'machine': platform.platform(),
+                       'results': self.results, 'accuracy': self.accuracy, 'validation': self.validation}, f,
+                      indent=2)
+
+    def compare(self, baseline: str, threshold: float = 0.2) -> list:
+        """
+        :param baseline: json file saved by a previous run
+        :param threshold: allowed relative slow-down (0.2 = 20%)
+        :return: list of regression messages
+        """
+        with open(baseline) as f:
+            old = {(r['name'], r['n']): r for r in json.load(f)['results']}
+
+        regressions = []
+        for res in self.results:
+            ref = old.get((res['name'], res['n']))
+            if ref is not None and res['seconds'] > ref['seconds'] * (1 + threshold):
+                regressions.append(f"{res['name']}[{res['n']}]: {ref['seconds']:.4f}s -> {res['seconds']:.4f}s "
+                                   f"(+{res['seconds'] / ref['seconds'] - 1:.0%})")
+        return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark suite of the BSM pricer")
+    parser.add_argument('--sizes', type=int, nargs='+', help="numbers of contracts (default 1e2 to 1e7)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per case, the best one is kept")
+    parser.add_argument('--only', nargs='+', help="names of the cases to run")
+    parser.add_argument('--workers', type=int, help="largest number of processes of the parallel pricing cases")
+    parser.add_argument('--output', default='benchmark_results.json', help="json file for the results")
+    parser.add_argument('--baseline', help="json file of a previous run to compare with")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed slow-down against the baseline")
+    parser.add_argument('--startup-budget', type=float, default=0.5,
+                        help="maximum time in seconds of the GUI imports (startup case)")
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(sizes=args.sizes, repeat=args.repeat, workers=args.workers)
+    suite.run(only=args.only)
+    suite.save(args.output)
+    print(f"Results saved in {args.output}")
+
+    regressions = []
+    if args.baseline:
+        regressions += suite.compare(args.baseline, args.threshold)
+    if not args.only or 'startup' in args.only:
+        regressions += [f"startup: {r['seconds']:.3f}s above the budget of {args.startup_budget}s"
+                        for r in suite.results if r['name'] == 'startup' and r['seconds'] > args.startup_budget]
+        regressions += [f"startup: {m} imported before the window" for m in startup_modules()]
+    for r in regressions:
+        print(f"REGRESSION {r}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
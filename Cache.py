@@ -0,0 +1,195 @@
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    FORMAT = 'parquet'
+except ImportError:
+    FORMAT = 'pickle'
+
+
+class MarketCache:
+    """
+    Local on-disk cache of market data (spots, maturities, option chains)
+    Every snapshot is a file <directory>/<kind>/<key>__<fetch timestamp in ms>.<format>
+    Attributes
+    ==========
+    directory: root folder of the cache
+    ttl: time to live of a snapshot in seconds, older snapshots are downloaded again
+    max_size: maximum size of the cache in bytes, the oldest snapshots are removed first
+    offline: replay the newest cached snapshot whatever its age, never download
+
+    """
+
+    def __init__(self, directory: str = '.market_cache', ttl: float = 900.0, max_size: int = 500 * 2 ** 20,
+                 offline: bool = False):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+
+        # private: (kind, clean key) -> [(timestamp, size, path)] newest first, built from the folder on first use
+        self._lock = threading.RLock()
+        self._index = None
+        self._size = 0
+
+    @staticmethod
+    def clean_key(key: str) -> str:
+        """
+        :return: key usable in a file name
+        """
+        return re.sub(r'[^A-Za-z0-9.\-]', '_', str(key))
+
+    def _scan(self) -> dict:
+        """
+        List the snapshots on disk once, the index is then kept up to date by put and evict
+        :return: index of the snapshots
+        """
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            index, size = {}, 0
+            for root, _, names in os.walk(self.directory):
+                kind = os.path.relpath(root, self.directory)
+                for n in names:
+                    if not n.endswith('.' + FORMAT):
+                        continue
+                    path = os.path.join(root, n)
+                    key, _, stamp = n[:-len(FORMAT) - 1].rpartition('__')
+                    try:
+                        snapshot = (int(stamp), os.path.getsize(path), path)
+                    except (FileNotFoundError, ValueError):
+                        continue
+                    index.setdefault((kind, key), []).append(snapshot)
+                    size += snapshot[1]
+            for snapshots in index.values():
+                snapshots.sort(reverse=True)
+            self._index, self._size = index, size
+            return index
+
+    def _remove(self, kind: str, key: str, snapshot: tuple):
+        # caller holds the lock
+        try:
+            os.remove(snapshot[2])
+        except FileNotFoundError:
+            pass
+        self._size -= snapshot[1]
+        snapshots = self._index.get((kind, key), [])
+        if snapshot in snapshots:
+            snapshots.remove(snapshot)
+        if not snapshots:
+            self._index.pop((kind, key), None)
+
+    def _snapshots(self, kind: str, key: str) -> list:
+        """
+        :return: list of (timestamp, path) of the snapshots of a key, newest first
+        """
+        with self._lock:
+            return [(t, path) for t, _, path in self._scan().get((kind, self.clean_key(key)), [])]
+
+    def keys(self, kind: str) -> set:
+        """
+        :param kind: type of data (e.g. 'chains')
+        :return: keys with at least one cached snapshot
+        """
+        with self._lock:
+            return {key for k, key in self._scan() if k == kind}
+
+    def get(self, kind: str, key: str):
+        """
+        :param kind: type of data (e.g. 'spots', 'expiries', 'chains')
+        :param key: ticker, ticker and maturity...
+        :return: newest snapshot still alive (any age in offline mode), None if there is none
+        """
+        for timestamp, path in self._snapshots(kind, key):
+            if not self.offline and time.time() - timestamp / 1000 > self.ttl:
+                return None
+            try:
+                return pd.read_parquet(path) if FORMAT == 'parquet' else pd.read_pickle(path)
+            except FileNotFoundError:  # evicted in the meantime
+                continue
+        return None
+
+    def put(self, kind: str, key: str, data: pd.DataFrame):
+        """
+        Save a new snapshot, remove the older snapshots of the key and evict the oldest ones if the cache is too big
+        :param kind: type of data
+        :param key: ticker, ticker and maturity...
+        :param data: dataframe to save
+        """
+        folder = os.path.join(self.directory, kind)
+        os.makedirs(folder, exist_ok=True)
+        key = self.clean_key(key)
+        path = os.path.join(folder, f"{key}__{int(time.time() * 1000)}.{FORMAT}")
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        if FORMAT == 'parquet':
+            data.to_parquet(tmp)
+        else:
+            data.to_pickle(tmp)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._scan()
+            for snapshot in list(self._index.get((kind, key), [])):
+                if snapshot[2] != path:
+                    self._remove(kind, key, snapshot)
+            if (kind, key) not in self._index:  # else the first scan already listed the new file
+                snapshot = (int(path.rsplit('__', 1)[1].split('.')[0]), os.path.getsize(path), path)
+                self._index[(kind, key)] = [snapshot]
+                self._size += snapshot[1]
+            if self._size > self.max_size:
+                self.evict()
+
+    def fetch(self, kind: str, key: str, loader) -> pd.DataFrame:
+        """
+        Get a snapshot from the cache or download it with the loader and cache it
+        :param kind: type of data
+        :param key: ticker, ticker and maturity...
+        :param loader: function without argument returning the dataframe
+        :return: dataframe
+        """
+        data = self.get(kind, key)
+        if data is not None:
+            return data
+        if self.offline:
+            raise FileNotFoundError(f"No cached {kind} for {key} (offline mode)")
+        data = loader()
+        self.put(kind, key, data)
+        return data
+
+    def size(self) -> int:
+        """
+        :return: size of the snapshots in bytes
+        """
+        with self._lock:
+            self._scan()
+            return self._size
+
+    def evict(self, target: float = 0.9):
+        """
+        Remove the oldest snapshots until the cache is under target x max_size, so a full cache is not sorted again
+        on every put
+        :param target: fraction of max_size left after an eviction
+        """
+        with self._lock:
+            index = self._scan()
+            if self._size <= self.max_size:
+                return
+            snapshots = sorted((snapshot, kind, key) for (kind, key), items in index.items() for snapshot in items)
+            for snapshot, kind, key in snapshots:
+                if self._size <= target * self.max_size:
+                    break
+                self._remove(kind, key, snapshot)
+
+    def clear(self):
+        """
+        Remove every snapshot
+        """
+        with self._lock:
+            for (kind, key), snapshots in list(self._scan().items()):
+                for snapshot in list(snapshots):
+                    self._remove(kind, key, snapshot)
@@ -0,0 +1,114 @@
+import argparse
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+import pandas as pd
+
+from Export import PortfolioWriter
+from Instrument import metrics
+from Option import ENGINES, Options
+from Valuation import DAY_COUNTS, ValuationDate
+
+
+def read_chunks(path: str, chunksize: int):
+    """
+    Read a portfolio file chunk by chunk
+    :param path: csv or parquet file with the Options.get_option columns
+    :param chunksize: number of rows per chunk
+    :return: iterator of dataframes
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize))
+    else:
+        chunks = iter(pd.read_csv(path, chunksize=chunksize))
+    while True:
+        with metrics.span('read'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def price_file(source: str, target: str, chunksize: int = 500_000, r: float = 0.05, q: float = 0.04,
+               rounded: bool = True, day_count: str = 'ACT/365', engine: str = 'bsm', steps: int = 500,
+               workers: int = 1, pool_chunksize: int = 250_000) -> int:
+    """
+    Price a portfolio file chunk by chunk and stream the results to another file, memory is bounded by the chunk size
+    :param source: csv or parquet portfolio (Ticker, Spot, Maturity, Type, Strike, Volatility...)
+    :param target: csv, parquet, feather or xlsx output, the input columns plus Price, Delta, Gamma, Vega, Theta and
+    Status
+    :param chunksize: number of rows priced at once
+    :param r: constant risk-free short rate
+    :param q: yield of the dividend
+    :param rounded: round the results like the scalar methods
+    :param day_count: day count convention of the times to maturity (ACT/365, ACT/360 or BUS/252)
+    :param engine: bsm (European closed form), crr or lr (American binomial trees)
+    :param steps: number of time steps of the binomial trees
+    :param workers: number of processes of the bsm engine, one pool is started for the whole file (0 for one per CPU)
+    :param pool_chunksize: number of contracts per task of the process pool
+    :return: number of rows priced
+    """
+    # same valuation date for every chunk, the expiries already converted are kept
+    valuation = ValuationDate(day_count=day_count)
+    if engine == 'bsm' and workers != 1:
+        from Parallel import ParallelPricer
+
+        pool = ParallelPricer(workers=workers or None, chunksize=pool_chunksize)
+    else:
+        pool = nullcontext()
+    writer = PortfolioWriter(target)
+    start = time.perf_counter()
+    try:
+        with pool as pricer:
+            for chunk in read_chunks(source, chunksize):
+                writer.write(chunk.join(Options.price_batch(chunk, r=r, q=q, rounded=rounded, valuation=valuation,
+                                                             engine=engine, steps=steps, pricer=pricer)))
+                elapsed = time.perf_counter() - start
+                print(f"{writer.rows:,} rows priced ({writer.rows / elapsed:,.0f} rows/s)", file=sys.stderr)
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless BSM pricing of a portfolio file")
+    parser.add_argument('source', help="portfolio file (.csv or .parquet)")
+    parser.add_argument('target', help="output file (.csv, .parquet, .feather or .xlsx)")
+    parser.add_argument('--chunksize', type=int, default=500_000, help="rows priced at once")
+    parser.add_argument('--rate', type=float, default=0.05, help="risk-free rate")
+    parser.add_argument('--dividend', type=float, default=0.04, help="dividend yield")
+    parser.add_argument('--day-count', default='ACT/365', choices=list(DAY_COUNTS), help="day count convention")
+    parser.add_argument('--engine', default='bsm', choices=list(ENGINES), help="pricing engine")
+    parser.add_argument('--steps', type=int, default=500, help="time steps of the binomial trees")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes of the bsm engine (0 for one per CPU), one pool for the whole file")
+    parser.add_argument('--pool-chunksize', type=int, default=250_000, help="contracts per task of the process pool")
+    parser.add_argument('--no-round', action='store_true', help="keep the full precision of the results")
+    parser.add_argument('--report', help="write the stage timings and counters to this JSON file")
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='PROF',
+                        help="cProfile the run, the statistics go to the report (and to PROF if given)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        parser.error(f"{args.source} does not exist")
+    metrics.reset()
+    if args.profile is not None:
+        with metrics.profiling(args.profile or None):
+            price_file(args.source, args.target, args.chunksize, args.rate, args.dividend, not args.no_round,
+                       args.day_count, args.engine, args.steps, args.workers, args.pool_chunksize)
+    else:
+        price_file(args.source, args.target, args.chunksize, args.rate, args.dividend, not args.no_round,
+                   args.day_count, args.engine, args.steps, args.workers, args.pool_chunksize)
+
+    print(metrics.summary(), file=sys.stderr)
+    if args.report:
+        metrics.save(args.report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
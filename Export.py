@@ -0,0 +1,120 @@
+import os
+
+import pandas as pd
+
+from Instrument import metrics
+
+# file extension -> export format
+FORMATS = {'.xlsx': 'xlsx', '.csv': 'csv', '.parquet': 'parquet', '.feather': 'feather'}
+XLSX_MAX_ROWS = 1_048_576
+
+
+def export_format(path: str, fmt: str = None) -> str:
+    """
+    :param path: target file
+    :param fmt: xlsx, csv, parquet or feather, guessed from the extension of the path by default
+    :return: export format
+    """
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in FORMATS.values():
+        raise ValueError(f"Unknown export format for {path}, use one of {', '.join(FORMATS)}")
+    return fmt
+
+
+class PortfolioWriter:
+    """
+    Write a portfolio chunk by chunk, only the current chunk is kept in memory
+    xlsx: xlsxwriter in constant memory mode (rows are flushed as they are written)
+    csv: appended chunks
+    parquet: one row group per chunk (pyarrow)
+    feather: one record batch per chunk (Arrow IPC file)
+    Attributes
+    ==========
+    path: target file
+    fmt: export format, guessed from the extension by default
+    sheet_name: sheet of the xlsx file
+
+    """
+
+    def __init__(self, path: str, fmt: str = None, sheet_name: str = 'Portfolio'):
+        self.path = path
+        self.fmt = export_format(path, fmt)
+        self.sheet_name = sheet_name
+        self.rows = 0
+
+        # private
+        self._writer = None
+        self._sheet = None
+        self._schema = None
+
+    def write(self, data: pd.DataFrame):
+        with metrics.span('export'):
+            if self.fmt == 'csv':
+                data.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+            elif self.fmt == 'xlsx':
+                self._write_xlsx(data)
+            else:
+                self._write_arrow(data)
+        self.rows += len(data)
+        metrics.count('rows_exported', len(data))
+
+    def _write_xlsx(self, data: pd.DataFrame):
+        if self._writer is None:
+            import xlsxwriter
+
+            self._writer = xlsxwriter.Workbook(self.path, {'constant_memory': True, 'nan_inf_to_errors': True})
+            self._sheet = self._writer.add_worksheet(self.sheet_name)
+            self._sheet.write_row(0, 0, list(data.columns))
+        if self.rows + len(data) >= XLSX_MAX_ROWS:
+            raise ValueError(f"An xlsx sheet is limited to {XLSX_MAX_ROWS - 1} rows, use csv, parquet or feather")
+
+        # dates as text, missing values as empty cells
+        data = data.apply(lambda c: c.astype(str) if pd.api.types.is_datetime64_any_dtype(c) else c)
+        data = data.astype(object).where(data.notna(), None)
+        for i, row in enumerate(data.itertuples(index=False, name=None), start=self.rows + 1):
+            self._sheet.write_row(i, 0, row)
+
+    def _write_arrow(self, data: pd.DataFrame):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            if self.fmt == 'parquet':
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self):
+        if self._writer is not None:
+            # the xlsx file is zipped on close
+            with metrics.span('export'):
+                self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_portfolio(data: pd.DataFrame, path: str = 'BSM_portfolio.xlsx', fmt: str = None,
+                     chunksize: int = 100_000) -> str:
+    """
+    Export a portfolio in chunks
+    :param data: dataframe to export
+    :param path: target file
+    :param fmt: xlsx, csv, parquet or feather, guessed from the extension by default
+    :param chunksize: number of rows written at once
+    :return: path of the file
+    """
+    with PortfolioWriter(path, fmt) as writer:
+        for start in range(0, len(data), chunksize):
+            writer.write(data.iloc[start:start + chunksize])
+        if len(data) == 0:
+            writer.write(data)
+    return path
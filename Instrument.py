@@ -0,0 +1,145 @@
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# counter -> span giving the rate of the counter (e.g. contracts priced per second of pricing)
+RATES = {'contracts_priced': 'pricing', 'rows_exported': 'export', 'tickers_fetched': 'get_option',
+         'contracts_fetched': 'get_option'}
+
+
+class Instrumentation:
+    """
+    Timers (spans) around the stages of the pipeline, counters and optional cProfile capture, reported as JSON
+    Spans and counters are aggregated by name and can be used from several threads
+    """
+
+    def __init__(self):
+        self.spans = {}
+        self.counters = {}
+        self.profile = None
+        self.started = datetime.now()
+
+        # private: profiles of the worker threads while profiling() runs, None otherwise
+        self._lock = threading.Lock()
+        self._profiles = None
+
+    def reset(self):
+        with self._lock:
+            self.spans = {}
+            self.counters = {}
+            self.profile = None
+            self.started = datetime.now()
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        Time a stage, e.g. with metrics.span('pricing'): ...
+        :param name: name of the stage
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                s = self.spans.setdefault(name, {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+                s['count'] += 1
+                s['total_s'] += elapsed
+                s['max_s'] = max(s['max_s'], elapsed)
+
+    def count(self, name: str, n: int = 1):
+        """
+        :param name: name of the counter
+        :param n: increment
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def profiling(self, path: str = None, top: int = 25):
+        """
+        cProfile capture, the top functions (cumulative time) go to the report. cProfile only sees the thread that
+        enables it: the calling thread is profiled here, the worker threads (e.g. the get_option downloads) by
+        thread_profile, and every profile is merged with pstats.Stats.add
+        :param path: optional .prof file for snakeviz/pstats
+        :param top: number of functions kept in the report
+        """
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._profiles = []
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                profiles, self._profiles = self._profiles, None
+            out = io.StringIO()
+            stats = pstats.Stats(profiler, stream=out)
+            for p in profiles:
+                stats.add(p)
+            if path:
+                stats.dump_stats(path)
+            stats.sort_stats('cumulative').print_stats(top)
+            self.profile = out.getvalue()
+
+    @contextmanager
+    def thread_profile(self):
+        """
+        Profile the body in the current (worker) thread while profiling() runs, its statistics are merged in the report
+        """
+        profiler = None
+        if self._profiles is not None:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # python >= 3.12, only one cProfile can be active at a time
+                profiler = None
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                with self._lock:
+                    if self._profiles is not None:
+                        self._profiles.append(profiler)
+
+    def report(self) -> dict:
+        """
+        :return: spans (count, total, mean and max seconds), counters, rates per second and profile
+        """
+        with self._lock:
+            spans = {name: {**s, 'mean_s': s['total_s'] / s['count']} for name, s in self.spans.items()}
+            counters = dict(self.counters)
+        rates = {f"{c}_per_s": counters[c] / spans[s]['total_s'] for c, s in RATES.items()
+                 if c in counters and s in spans and spans[s]['total_s'] > 0}
+        return {'started': self.started.isoformat(), 'spans': spans, 'counters': counters, 'rates': rates,
+                'profile': self.profile}
+
+    def save(self, path: str):
+        """
+        :param path: json file of the report
+        """
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def summary(self) -> str:
+        """
+        :return: human readable report (stages sorted by total time)
+        """
+        rep = self.report()
+        lines = [f"{'stage':<20}{'count':>8}{'total s':>12}{'mean s':>12}{'max s':>12}"]
+        for name, s in sorted(rep['spans'].items(), key=lambda x: -x[1]['total_s']):
+            lines.append(f"{name:<20}{s['count']:>8}{s['total_s']:>12.4f}{s['mean_s']:>12.4f}{s['max_s']:>12.4f}")
+        lines += [f"{name}: {value:,}" for name, value in rep['counters'].items()]
+        lines += [f"{name}: {value:,.0f}" for name, value in rep['rates'].items()]
+        return '\n'.join(lines)
+
+
+# instrumentation shared by the whole application
+metrics = Instrumentation()
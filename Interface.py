@@ -1,11 +1,25 @@
+from __future__ import annotations
+
+import queue
+import threading
 import tkinter as tk
 from datetime import datetime
+from tkinter import filedialog
 from tkinter import messagebox
 from tkinter import ttk
+from typing import TYPE_CHECKING
 
-from pandastable import Table
+from Instrument import metrics
+from Lattice import BinomialTree
+from Memo import PricingCache
+from Option import ENGINES, Chart, Options
+from Valuation import ValuationDate
 
-from Option import *
+# pandas, pandastable and the market data/export modules are imported when their feature is first used, the window
+# only needs tkinter and numpy to come up
+if TYPE_CHECKING:
+    import pandas as pd
+    from pandastable import Table
 
 
 class App(tk.Tk):
@@ -21,6 +35,10 @@ class App(tk.Tk):
         self.geometry("525x505")
         self.minsize(525, 505)
 
+        # prices and Greeks already computed by the Minor frame and the chart (not the portfolio runs, whose
+        # valuation instant changes every run so their keys never repeat)
+        self.pricing_cache = PricingCache()
+
         # widgets
         self.minor_frame = Minor(self)
         self.main_frame = Main(self)
@@ -46,6 +64,9 @@ class Minor(ttk.Frame):
         super().__init__(parent)
         self.configure(relief='ridge')
         self.grid(row=0, column=0, sticky="nsew")
+        self.pricing_cache = parent.pricing_cache
+        # one valuation instant per day, the same inputs give the same key of the pricing cache
+        self.valuation = ValuationDate()
 
         # Option status
         self.lbl_val = None
@@ -94,6 +115,13 @@ class Minor(ttk.Frame):
         self.ent_div = ttk.Entry(self, width=8)
         self.ent_div.grid(row=8, column=1, padx=1, pady=3)
 
+        # pricing engine, the binomial trees value the early exercise of American options
+        self.lbl_engine = ttk.Label(self, text='engine:')
+        self.lbl_engine.grid(row=7, column=2, padx=1, pady=1)
+        self.cmb_engine = ttk.Combobox(self, values=[e.upper() for e in ENGINES], width=6, state='readonly')
+        self.cmb_engine.current(0)
+        self.cmb_engine.grid(row=7, column=3, padx=1, pady=3)
+
         self.btn_compute = ttk.Button(self, text='Compute', command=self.calculate)
         self.btn_compute.grid(row=9, column=0, columnspan=2, padx=7, pady=22)
 
@@ -149,7 +177,9 @@ class Minor(ttk.Frame):
             strike_price = float(self.ent_strike.get())
             spot_price = float(self.ent_spot.get())
             try:
-                maturity = (datetime.strptime(self.ent_maturity.get(), '%d/%m/%Y') - datetime.now()).days / 365
+                if self.valuation.now.date() != datetime.now().date():
+                    self.valuation = ValuationDate()
+                maturity = self.valuation.year_fraction(self.ent_maturity.get(), '%d/%m/%Y')
             except Exception as e:
                 print(e.args)
                 messagebox.showerror("showerror", "The maturity should be in DD/MM/YYYY")
@@ -166,13 +196,22 @@ class Minor(ttk.Frame):
             div = 0.04
 
         op = Options(strike_price, spot_price, maturity, volatility, rf, div)
-        price = op.bsm(op_type)
-        delta = op.delta(op_type)
-        gamma = op.gamma()
-        vega = op.vega()
-        theta = op.theta(op_type)
-        status = op.intrinsic_value(op_type)[0]
-        value = str(op.intrinsic_value(op_type)[1])
+        engine = self.cmb_engine.get().lower()
+        try:
+            if engine == 'bsm':
+                res = self.pricing_cache.greeks(strike_price, spot_price, maturity, volatility, op_type, rf, div)
+            elif op_type in ('CALL', 'PUT'):
+                res = BinomialTree(method=engine.upper()).greeks(strike_price, spot_price, maturity, volatility,
+                                                                 op_type == 'CALL', rf, div)
+            else:
+                raise ValueError(f"Option type should be either CALL or PUT, got {op_type!r}")
+            price, delta, gamma, vega, theta = res.round()
+        except ValueError as e:
+            print(e.args)
+            messagebox.showerror("showerror", "The option type should be either Call or Put")
+            return
+        status, value = op.intrinsic_value(op_type)
+        value = str(value)
 
         self.ent_price.delete(0, tk.END)
         self.ent_price.insert(0, str(price))
@@ -239,66 +278,295 @@ class Main(ttk.Frame):
         self.lbl_title = ttk.Label(self, text="BSM model on random Portfolio")
         self.lbl_title.grid(row=0, column=1, padx=5, pady=25, columnspan=3)
 
+        self.lbl_engine = ttk.Label(self, text='Engine:')
+        self.lbl_engine.grid(row=4, column=1, padx=7)
+        self.cmb_engine = ttk.Combobox(self, values=[e.upper() for e in ENGINES], width=6, state='readonly')
+        self.cmb_engine.current(0)
+        self.cmb_engine.grid(row=4, column=2, padx=7)
+
         self.btn_run = ttk.Button(self, text='Run', command=self.run_bsm_ptf)
-        self.btn_run.grid(row=5, column=1, columnspan=2, padx=7, pady=22)
+        self.btn_run.grid(row=5, column=1, padx=7, pady=22)
+
+        self.btn_cancel = ttk.Button(self, text='Cancel', command=self.cancel_run, state='disabled')
+        self.btn_cancel.grid(row=5, column=2, padx=7, pady=22)
 
         self.var2 = tk.IntVar()
-        self.chk_report = ttk.Checkbutton(self, text="Export to Excel", variable=self.var2,
+        self.chk_report = ttk.Checkbutton(self, text="Export (xlsx, csv, parquet...)", variable=self.var2,
                                           onvalue=1, offvalue=0)
         self.chk_report.grid(row=6, column=1, columnspan=2, padx=7, pady=20, sticky='nsew')
 
         self.btn_chart = ttk.Button(self, text="Generate Options' chart", command=self.chart_op)
         self.btn_chart.grid(row=7, column=1, columnspan=2, padx=7, pady=20)
 
-    @staticmethod
-    def generate_excel(data: pd.DataFrame):
-        data.to_excel("BSM_portfolio.xlsx", sheet_name='Portfolio', index=False)
+        # market data cache, offline mode replays the last downloaded data (created on the first run)
+        self.cache = None
+        self.provider = None
+        self.var_offline = tk.IntVar()
+        self.chk_offline = ttk.Checkbutton(self, text="Offline (cached data)", variable=self.var_offline,
+                                           onvalue=1, offvalue=0)
+        self.chk_offline.grid(row=8, column=1, columnspan=2, padx=7, pady=20, sticky='nsew')
+
+        # background run: the worker thread only talks to the GUI through the queue, read by poll_run
+        self.progress = ttk.Progressbar(self, mode='determinate', length=180)
+        self.progress.grid(row=9, column=1, columnspan=2, padx=7)
+        self.lbl_progress = ttk.Label(self, text='')
+        self.lbl_progress.grid(row=10, column=1, columnspan=2, padx=7, pady=5)
+        self.messages = queue.Queue()
+        self.cancel = threading.Event()
+        # result handed back to the worker for the export, so the priced rows only live in the GUI
+        self.exports = queue.Queue()
+
+        # stage timings and counters of the last run, cProfile of the worker thread on demand
+        self.var_profile = tk.IntVar()
+        self.chk_profile = ttk.Checkbutton(self, text="Profile the run", variable=self.var_profile,
+                                           onvalue=1, offvalue=0)
+        self.chk_profile.grid(row=11, column=1, columnspan=2, padx=7, pady=5, sticky='nsew')
+        self.btn_report = ttk.Button(self, text='Run report', command=self.show_report)
+        self.btn_report.grid(row=12, column=1, columnspan=2, padx=7, pady=5)
+
+        # every maturity and strike of every ticker instead of one call and one put per ticker
+        self.var_full_chain = tk.IntVar()
+        self.chk_full_chain = ttk.Checkbutton(self, text="Full option chains", variable=self.var_full_chain,
+                                              onvalue=1, offvalue=0)
+        self.chk_full_chain.grid(row=13, column=1, columnspan=2, padx=7, pady=5, sticky='nsew')
+        self.table = None
+        self.result = None
+        self.frames = []
+        self.rows = 0
+        self.full_chain = False
+        self.pricing_cache = parent.pricing_cache
 
-    def run_bsm_ptf(self):
+    @staticmethod
+    def generate_excel(data: pd.DataFrame, path: str = "BSM_portfolio.xlsx"):
         """
-        Lunch BSM model computation of option price, delta, gamma and vega
-        Returns: dataframe with all options infos
-        -------
+        Export the portfolio, the format (xlsx, csv, parquet or feather) follows the extension of the path
         """
+        from Export import export_portfolio
+
+        export_portfolio(data, path)
 
-        stock_price = Options.retrieve_ticker()  # retrieve the ticker and spot
-        df = Options.get_option(stock_price)  # retrieve option data from yahoo finance
-
-        df['Price'] = 0
-        df['Delta'] = 0
-        df['Gamma'] = 0
-        df['Vega'] = 0
-        df['Theta'] = 0
-        df['Status'] = 0
-
-        # Computing Option price, delta, gamma and vega
-        for i in range(len(df)):
-            #  Instantiation of Options class
-            op = Options(strike=df['Strike'].loc[i], spot=df['Spot'].loc[i], sigma=df['Volatility'].loc[i],
-                         t=(datetime.strptime(df['Maturity'].loc[i], '%Y-%m-%d') - datetime.now()).days / 365)
-
-            df['Status'].loc[i] = op.intrinsic_value(option_type=df['Type'].loc[i].upper())[0]
-            df['Price'].loc[i] = op.bsm(option_type=df['Type'].loc[i].upper())
-            df['Delta'].loc[i] = op.delta(option_type=df['Type'].loc[i].upper())
-            df['Theta'].loc[i] = op.theta(option_type=df['Type'].loc[i].upper())
-            df['Gamma'].loc[i] = op.gamma()
-            df['Vega'].loc[i] = op.vega()
+    @staticmethod
+    def price_portfolio(data: pd.DataFrame, valuation: ValuationDate = None, cache: PricingCache = None,
+                        engine: str = 'bsm') -> pd.DataFrame:
+        """
+        Computing Option price, delta, gamma, vega and theta for the whole portfolio at once
+        :param data: dataframe from Options.get_option
+        :param valuation: valuation date and day count, ValuationDate() by default
+        :param cache: optional pricing cache, only the contracts not priced yet are computed (bsm engine)
+        :param engine: bsm (European), crr or lr (American binomial trees)
+        :return: data with the Price, Delta, Gamma, Vega, Theta and Status columns
+        """
+        return data.join(Options.price_batch(data, valuation=valuation, cache=cache, engine=engine))
 
+    def run_bsm_ptf(self):
+        """
+        Lunch BSM model computation of option price, delta, gamma and vega in a background thread, the table is
+        filled as the tickers are priced
+        """
+        export_path = None
         if self.var2.get() == 1:
-            self.generate_excel(data=df)
+            from Export import FORMATS
+
+            export_path = filedialog.asksaveasfilename(
+                parent=self, initialfile="BSM_portfolio.xlsx", defaultextension=".xlsx",
+                filetypes=[(fmt.upper(), '*' + ext) for ext, fmt in FORMATS.items()])
+            if not export_path:
+                return
+
+        if self.provider is None:
+            from Cache import MarketCache
+            from Provider import CachedProvider, YahooProvider
+
+            self.cache = MarketCache()
+            self.provider = CachedProvider(YahooProvider(), self.cache)
+        self.cache.offline = self.var_offline.get() == 1
+        self.cancel.clear()
+        metrics.reset()
+        self.result = None
+        self.frames = []
+        self.rows = 0
+        self.table = None
+        self.full_chain = self.var_full_chain.get() == 1
+        self.btn_run.configure(state='disabled')
+        self.btn_cancel.configure(state='normal')
+        self.progress.configure(value=0)
+
+        threading.Thread(target=self.run_worker, daemon=True,
+                         args=(export_path, self.var_profile.get() == 1, self.cmb_engine.get().lower(),
+                               self.full_chain)).start()
+        self.after(100, self.poll_run)
+
+    def run_worker(self, export_path: str = None, profile: bool = False, engine: str = 'bsm',
+                   full_chain: bool = False):
+        """
+        Background part of the run, every result goes to the GUI through self.messages
+        :param export_path: file where the portfolio is exported at the end, no export if None
+        :param profile: cProfile the worker thread, the statistics go to the run report
+        :param engine: pricing engine (bsm, crr or lr)
+        :param full_chain: download every maturity and strike (Options.get_option full_chain mode)
+        """
+        if profile:
+            with metrics.profiling():
+                self._run(export_path, engine, full_chain)
+        else:
+            self._run(export_path, engine, full_chain)
 
-        self.manage_pdtable(data=df)
+    def _run(self, export_path: str = None, engine: str = 'bsm', full_chain: bool = False):
+        import pandas as pd
 
-    @staticmethod
-    def chart_op():
         try:
-            Chart.option_chart()
+            self.messages.put(('stage', 'Retrieving the tickers...', 0))
+            try:
+                stock_price = Options.retrieve_ticker(provider=self.provider)  # retrieve the ticker and spot
+            except FileNotFoundError as e:
+                print(e.args)
+                self.messages.put(('error', "No cached market data, please run once online"))
+                return
+
+            valuation = ValuationDate()
+            total = len(stock_price)
+            finished = []
+            # one Ticker dtype for every chain, the concatenations of the GUI stay categorical
+            tickers = pd.CategoricalDtype([ticker for ticker, _ in stock_price])
+
+            def on_ticker(ticker, rows, error):
+                finished.append(ticker)
+                if len(rows):
+                    # the full chain rows already have the compact dtypes, only the GUI keeps the priced rows
+                    data = pd.DataFrame(rows)
+                    if full_chain:
+                        data['Ticker'] = data['Ticker'].astype(tickers)
+                    self.messages.put(('rows', self.price_portfolio(data, valuation, engine=engine)))
+                self.messages.put(('stage', f'{ticker} done ({len(finished)}/{total})', len(finished) / total * 100))
+
+            # retrieve option data from yahoo finance
+            Options.get_option(stock_price, provider=self.provider, callback=on_ticker, cancel=self.cancel,
+                               full_chain=full_chain, collect=False)
+            if self.cancel.is_set():
+                self.messages.put(('done', 'Cancelled'))
+                return
+
+            if export_path:
+                # the GUI hands back its result once every row before this message is in it
+                self.messages.put(('export', export_path))
+                data = None
+                # the GUI may never answer (window closed, poll_run failed): Cancel still ends the worker
+                while not self.cancel.is_set():
+                    try:
+                        data = self.exports.get(timeout=0.5)
+                        break
+                    except queue.Empty:
+                        continue
+                if self.cancel.is_set():
+                    self.messages.put(('done', 'Cancelled'))
+                    return
+                if data is not None:
+                    self.generate_excel(data=data, path=export_path)
+            self.messages.put(('finished', None))
+        except Exception as e:
+            print(e)
+            self.messages.put(('error', f"Run failed: {e}"))
+
+    def poll_run(self):
+        """
+        Apply the messages of the worker on the GUI (Tk main thread), then poll again until the run is over
+        """
+        frames = []
+        while True:
+            try:
+                msg = self.messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if msg[0] == 'rows':
+                frames.append(msg[1])
+            elif msg[0] == 'stage':
+                self.lbl_progress.configure(text=msg[1])
+                self.progress.configure(value=msg[2])
+            elif msg[0] == 'export':
+                self.append_rows(frames, final=True)
+                frames = []
+                self.lbl_progress.configure(text=f'Export to {msg[1]}...')
+                self.exports.put(self.result)
+            else:
+                self.append_rows(frames, final=True)
+                if msg[0] == 'finished':
+                    footprint = Options.memory_footprint(self.result) if self.result is not None else {'bytes': 0}
+                    msg = ('done', f"{0 if self.result is None else len(self.result):,} options priced "
+                                   f"({footprint['bytes'] / 2 ** 20:.1f} MB)")
+                self.lbl_progress.configure(text=msg[1])
+                self.btn_run.configure(state='normal')
+                self.btn_cancel.configure(state='disabled')
+                if msg[0] == 'error':
+                    messagebox.showerror("showerror", msg[1])
+                return
+
+        self.append_rows(frames)
+        self.after(100, self.poll_run)
+
+    def append_rows(self, frames: list, final: bool = False):
+        """
+        Keep the tickers priced since the last poll, the result and the table are only rebuilt once the new rows
+        outnumber the shown ones, so a run copies every row a few times instead of once per poll
+        :param frames: priced dataframes of the worker
+        :param final: rebuild the result with every priced row (export, end of the run)
+        """
+        import pandas as pd
+
+        self.frames.extend(frames)
+        self.rows += sum(len(f) for f in frames)
+        shown = 0 if self.result is None else len(self.result)
+        if self.rows == shown or (not final and self.rows < 2 * shown):
+            return
+        # the chains share their Ticker dtype (see _run), the concatenation keeps the categorical columns
+        self.result = pd.concat(self.frames, ignore_index=True)
+        self.frames = [self.result]
+        with metrics.span('table_render'):
+            if self.table is None:
+                self.table = self.manage_pdtable(data=self.result)
+            else:
+                self.table.model.df = self.result
+                self.table.redraw()
+
+    def cancel_run(self):
+        self.cancel.set()
+        self.lbl_progress.configure(text='Cancelling...')
+
+    def show_report(self):
+        """
+        Display the stage timings, counters and profile of the last run, the JSON report can be saved from the window
+        """
+        window = Window(self)
+        window.title('Run report')
+
+        text = tk.Text(window, width=100, height=30, font='TkFixedFont')
+        text.insert('end', metrics.summary())
+        cache = self.pricing_cache.stats()
+        text.insert('end', f"\n\nPricing cache: {cache['hits']:,} hits, {cache['misses']:,} misses, "
+                           f"{cache['evictions']:,} evictions, {cache['size']:,}/{cache['max_size']:,} contracts "
+                           f"({cache['hit_rate']:.0%} hit rate)")
+        if metrics.profile:
+            text.insert('end', '\n\n' + metrics.profile)
+        text.configure(state='disabled')
+        text.pack(fill='both', expand=True)
+
+        def save():
+            path = filedialog.asksaveasfilename(parent=window, initialfile="BSM_report.json",
+                                                defaultextension=".json", filetypes=[('JSON', '*.json')])
+            if path:
+                metrics.save(path)
+
+        ttk.Button(window, text='Save JSON', command=save).pack(pady=5)
+
+    def chart_op(self):
+        try:
+            Chart.option_chart(cache=self.pricing_cache)
             messagebox.showinfo("info", "PDF successfully generated!")
         except Exception as e:
             print(e)
             messagebox.showinfo("info", "unable to generate PDF")
 
-    def manage_pdtable(self, data: pd.DataFrame):
+    def manage_pdtable(self, data: pd.DataFrame) -> Table:
         """
         Create a new window and display data in an Excel way , plot are feasible by using the plot button on the new
         interface
@@ -306,8 +574,11 @@ class Main(ttk.Frame):
         Parameters
         ----------
         data : Dataframe the need to be displayed in the new window
+        Returns: the Table, to update it later
         -------
         """
+        from pandastable import Table
+
         window = Window(self)
 
         frame = tk.Frame(master=window)
@@ -317,3 +588,5 @@ class Main(ttk.Frame):
         pt.show()
 
         pt.model.df = data
+        pt.redraw()
+        return pt
@@ -0,0 +1,155 @@
+import numpy as np
+
+from Option import Greeks, Options
+
+# lattices of BinomialTree
+METHODS = ('CRR', 'LR')
+
+
+class BinomialTree:
+    """
+    Binomial lattice pricer for American (or European) options, same inputs as Options (strike, spot, t, sigma, r, q)
+    The backward induction is vectorized over the nodes of a time step and over the contracts, in place on
+    (nodes x contracts) buffers. The contracts are priced in chunks of max_nodes terminal nodes so the buffers stay in
+    the CPU cache (about 3 x 800 kB by default)
+    CRR: Cox-Ross-Rubinstein, u = exp(sigma * sqrt(dt)) and d = 1 / u
+    LR: Leisen-Reimer, probabilities from the Peizer-Pratt inversion of d1 and d2 (odd number of steps), converges
+    much faster and without the odd/even oscillation of CRR
+    Attributes
+    ==========
+    steps: number of time steps, at least 3 (LR uses steps + 1 when steps is even)
+    method: CRR or LR
+    american: early exercise at every node
+    max_nodes: maximum number of terminal nodes (contracts x (steps + 1)) handled at once
+
+    """
+
+    def __init__(self, steps: int = 500, method: str = 'LR', american: bool = True, max_nodes: int = 100_000):
+        if method not in METHODS:
+            raise ValueError(f"Unknown lattice {method}, use one of {', '.join(METHODS)}")
+        if steps < 3:
+            raise ValueError(f"A binomial tree needs at least 3 steps for its Greeks, got {steps}")
+        self.method = method
+        self.steps = steps + 1 if method == 'LR' and steps % 2 == 0 else steps
+        self.american = american
+        self.max_nodes = max_nodes
+
+    @staticmethod
+    def _peizer_pratt(z, n: int):
+        return 0.5 + np.sign(z) * np.sqrt(0.25 - 0.25 * np.exp(-(z / (n + 1 / 3 + 0.1 / (n + 1))) ** 2 * (n + 1 / 6)))
+
+    def _moves(self, strike, spot, t, sigma, r: float, q: float) -> tuple:
+        """
+        :return: up and down factors and up probability of each contract
+        """
+        dt = t / self.steps
+        growth = np.exp((r - q) * dt)
+        if self.method == 'CRR':
+            up = np.exp(sigma * np.sqrt(dt))
+            down = 1 / up
+            p = (growth - down) / (up - down)
+        else:
+            op = Options(strike, spot, t, sigma, r, q)
+            p = self._peizer_pratt(op._d2, self.steps)
+            up = growth * self._peizer_pratt(op._d1, self.steps) / p
+            down = (growth - p * up) / (1 - p)
+        return up, down, p
+
+    def _induction(self, strike, spot, t, sigma, sign, r: float, q: float) -> tuple:
+        """
+        Backward induction of one chunk of contracts (1d arrays)
+        :return: values and stock prices of the nodes at steps 0, 1 and 2
+        """
+        n = self.steps
+        up, down, p = self._moves(strike, spot, t, sigma, r, q)
+        disc = np.exp(-r * t / n)
+        disc_up, disc_down = disc * p, disc * (1 - p)
+
+        # terminal nodes (nodes x contracts), row i after i up moves, the contracts are contiguous in a row
+        i = np.arange(n + 1)[:, None]
+        stock = spot * np.exp(i * np.log(up) + (n - i) * np.log(down))
+        value = np.maximum(sign * (stock - strike), 0)
+        inv_down = 1 / down
+
+        # each step is computed in place on the first step + 1 rows of the buffers
+        tmp = np.empty_like(value)
+        nodes = {}
+        for step in range(n - 1, -1, -1):
+            m = step + 1
+            np.multiply(value[1:m + 1], disc_up, out=tmp[:m])
+            value[:m] *= disc_down
+            value[:m] += tmp[:m]
+            # node i of this step goes to node i of the next one with a down move
+            stock[:m] *= inv_down
+            if self.american:
+                np.subtract(stock[:m], strike, out=tmp[:m])
+                tmp[:m] *= sign
+                np.maximum(value[:m], tmp[:m], out=value[:m])
+            if step <= 2:
+                nodes[step] = (value[:m].copy(), stock[:m].copy())
+        return nodes
+
+    def greeks(self, strike, spot, t, sigma, is_call, r: float = 0.05, q: float = 0.04) -> Greeks:
+        """
+        Price and Greeks, delta, gamma and theta from the nodes of the first two steps and vega from a second tree
+        with sigma + 1%. Same units as Options.greeks (vega per 1% of volatility, theta per calendar day), gamma and
+        theta are the lattice estimates of the true sensitivities
+        :param strike: strike prices
+        :param spot: stock prices
+        :param t: times to maturity (in year fractions)
+        :param sigma: volatilities
+        :param is_call: boolean array, True for calls
+        :param r: constant risk-free short rate
+        :param q: yield of the dividend
+        :return: Greeks record of arrays with the broadcast shape of the inputs (nan where t or sigma is not positive)
+        """
+        strike, spot, t, sigma, is_call = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in
+                                                                (strike, spot, t, sigma)), np.asarray(is_call, bool))
+        shape = strike.shape
+        strike, spot, t, sigma, is_call = (x.ravel() for x in (strike, spot, t, sigma, is_call))
+        sign = np.where(is_call, 1.0, -1.0)
+
+        out = np.full((len(Greeks._fields), strike.size), np.nan)
+        valid = np.flatnonzero((t > 0) & (sigma > 0) & (spot > 0) & (strike > 0))
+        chunk = max(1, self.max_nodes // (self.steps + 1))
+        for start in range(0, valid.size, chunk):
+            rows = valid[start:start + chunk]
+            args = strike[rows], spot[rows], t[rows], sigma[rows], sign[rows]
+            nodes = self._induction(*args, r, q)
+            (v0, _), (v1, s1), (v2, s2) = nodes[0], nodes[1], nodes[2]
+            delta_up = (v2[2] - v2[1]) / (s2[2] - s2[1])
+            delta_down = (v2[1] - v2[0]) / (s2[1] - s2[0])
+            bumped = self._induction(args[0], args[1], args[2], args[3] + 0.01, args[4], r, q)[0][0]
+
+            delta = (v1[1] - v1[0]) / (s1[1] - s1[0])
+            gamma = (delta_up - delta_down) / ((s2[2] - s2[0]) / 2)
+            # the middle node of step 2 is at spot * u * d, only equal to spot for CRR: its value is moved back to
+            # the spot with delta and gamma before the time difference (no bias on the LR theta)
+            gap = s2[1] - args[1]
+            middle = v2[1] - delta * gap - gamma * gap ** 2 / 2
+
+            out[0, rows] = v0[0]
+            out[1, rows] = delta
+            out[2, rows] = gamma
+            out[3, rows] = bumped[0] - v0[0]
+            out[4, rows] = (middle - v0[0]) / (2 * t[rows] / self.steps) / 365
+        return Greeks(*(values.reshape(shape)[()] for values in out))
+
+    def price(self, strike, spot, t, sigma, is_call, r: float = 0.05, q: float = 0.04) -> np.ndarray:
+        """
+        Price only, one tree per contract (no vega tree)
+        :return: array with the broadcast shape of the inputs
+        """
+        strike, spot, t, sigma, is_call = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in
+                                                                (strike, spot, t, sigma)), np.asarray(is_call, bool))
+        shape = strike.shape
+        strike, spot, t, sigma, is_call = (x.ravel() for x in (strike, spot, t, sigma, is_call))
+        sign = np.where(is_call, 1.0, -1.0)
+
+        out = np.full(strike.size, np.nan)
+        valid = np.flatnonzero((t > 0) & (sigma > 0) & (spot > 0) & (strike > 0))
+        chunk = max(1, self.max_nodes // (self.steps + 1))
+        for start in range(0, valid.size, chunk):
+            rows = valid[start:start + chunk]
+            out[rows] = self._induction(strike[rows], spot[rows], t[rows], sigma[rows], sign[rows], r, q)[0][0][0]
+        return out.reshape(shape)[()]
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, path: str,
+                  body: dict = None) -> dict:
+    """
+    One HTTP/1.1 request on a keep-alive connection
+    :return: json response
+    """
+    data = json.dumps(body).encode() if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    await reader.readline()
+    length = 0
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return json.loads(await reader.readexactly(length))
+
+
+async def client(host: str, port: int, contracts: int, deadline: float, latencies: list, seed: int):
+    """
+    Send requests of random contracts one after the other until the deadline
+    """
+    rng = np.random.default_rng(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            body = {'strike': rng.uniform(50, 150, contracts).round(2).tolist(), 'spot': 100.0,
+                    't': rng.uniform(0.05, 3, contracts).round(4).tolist(),
+                    'sigma': rng.uniform(0.05, 1.0, contracts).round(4).tolist(),
+                    'type': np.where(rng.random(contracts) < 0.5, 'CALL', 'PUT').tolist()}
+            start = time.perf_counter()
+            res = await request(reader, writer, 'POST', '/price', body)
+            latencies.append(time.perf_counter() - start)
+            if len(res['price']) != contracts:
+                raise RuntimeError(f"Unexpected response: {res}")
+    finally:
+        writer.close()
+
+
+async def run(host: str, port: int, clients: int, contracts: int, duration: float) -> dict:
+    """
+    :param host: host of the pricing service
+    :param port: port of the pricing service
+    :param clients: number of concurrent connections
+    :param contracts: contracts per request
+    :param duration: seconds of load
+    :return: client side throughput and latency percentiles (ms), server side statistics
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, contracts, start + duration, latencies, seed)
+                           for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    server = await request(reader, writer, 'GET', '/stats')
+    writer.close()
+
+    latencies = np.array(latencies) * 1000
+    return {'clients': clients, 'contracts_per_request': contracts, 'requests': len(latencies),
+            'requests_per_s': len(latencies) / elapsed, 'contracts_per_s': len(latencies) * contracts / elapsed,
+            'latency_ms': {f"p{p}": float(np.percentile(latencies, p)) for p in (50, 90, 99)}, 'server': server}
+
+
+async def wait_ready(host: str, port: int, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            await request(reader, writer, 'GET', '/health')
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load generator of the pricing service (Service.py)")
+    parser.add_argument('--host', default='127.0.0.1', help="host of the service")
+    parser.add_argument('--port', type=int, default=8765, help="port of the service")
+    parser.add_argument('--clients', type=int, default=64, help="concurrent connections")
+    parser.add_argument('--contracts', type=int, default=10, help="contracts per request")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of load")
+    parser.add_argument('--serve', action='store_true', help="start the service in a subprocess first")
+    parser.add_argument('--max-batch', type=int, default=4096, help="max batch of the started service")
+    parser.add_argument('--max-wait', type=float, default=2.0, help="max wait (ms) of the started service")
+    parser.add_argument('--output', help="json file for the results")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.serve:
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Service.py')
+        server = subprocess.Popen([sys.executable, script, '--host', args.host, '--port', str(args.port),
+                                   '--max-batch', str(args.max_batch), '--max-wait', str(args.max_wait)])
+    try:
+        asyncio.run(wait_ready(args.host, args.port))
+        res = asyncio.run(run(args.host, args.port, args.clients, args.contracts, args.duration))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    lat, srv = res['latency_ms'], res['server']
+    print(f"{res['requests']:,} requests ({res['requests_per_s']:,.0f}/s, {res['contracts_per_s']:,.0f} contracts/s) "
+          f"from {args.clients} clients")
+    print(f"client latency p50 {lat['p50']:.2f} ms  p90 {lat['p90']:.2f} ms  p99 {lat['p99']:.2f} ms")
+    print(f"server: {srv['batches']:,} batches (mean {srv['mean_batch']:.0f} contracts), latency p50 "
+          f"{srv['latency_ms']['p50']:.2f} ms  p99 {srv['latency_ms']['p99']:.2f} ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(res, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
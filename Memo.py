@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict
+from itertools import repeat
+
+import numpy as np
+
+from Option import Greeks, Options
+
+
+class PricingCache:
+    """
+    Bounded LRU cache of prices and Greeks in front of Options.greeks
+    The key is (is_call, strike, spot, t, sigma, r, q) rounded to `decimals` digits and the values are computed on the
+    rounded inputs, so a result does not depend on which request filled the cache
+    Attributes
+    ==========
+    max_size: maximum number of contracts kept, the least recently used ones are evicted first
+    decimals: quantization of the inputs in the key
+    hits: number of contracts served from the cache
+    misses: number of contracts computed
+    evictions: number of contracts dropped to stay under max_size
+
+    """
+
+    def __init__(self, max_size: int = 100_000, decimals: int = 8):
+        self.max_size = max_size
+        self.decimals = decimals
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # private: key -> (price, delta, gamma, vega, theta), the GUI frames and the worker thread share one cache
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _get(self, key: tuple):
+        values = self._data.get(key)
+        if values is not None:
+            self._data.move_to_end(key)
+        return values
+
+    def _put(self, key: tuple, values: tuple):
+        self._data[key] = values
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def greeks(self, strike: float, spot: float, t: float, sigma: float, option_type: str, r: float = 0.05,
+               q: float = 0.04) -> Greeks:
+        """
+        Price and Greeks of one option, same result as Options(...).greeks(option_type) on the rounded inputs
+        :param option_type: 'CALL' or 'PUT'
+        :return: Greeks record (not rounded)
+        """
+        if option_type not in ('CALL', 'PUT'):
+            raise ValueError(f"Option type should be either CALL or PUT, got {option_type!r}")
+        key = (option_type == 'CALL', *(round(float(x), self.decimals) for x in (strike, spot, t, sigma, r, q)))
+        with self._lock:
+            values = self._get(key)
+            if values is not None:
+                self.hits += 1
+                return Greeks(*values)
+
+        values = Options(*key[1:5], r=key[5], q=key[6]).greeks(key[0])
+        with self._lock:
+            self.misses += 1
+            self._put(key, tuple(float(v) for v in values))
+        return Greeks(*(float(v) for v in values))
+
+    def greeks_batch(self, strike, spot, t, sigma, is_call, r: float = 0.05, q: float = 0.04) -> Greeks:
+        """
+        Array request: the cached contracts are looked up, only the missing ones (each distinct key once) go through
+        the vectorized Options.greeks
+        :param strike: strike prices
+        :param spot: stock prices
+        :param t: times to maturity (in year fractions)
+        :param sigma: volatilities
+        :param is_call: boolean array, True for calls
+        :param r: constant risk-free short rate
+        :param q: yield of the dividend
+        :return: Greeks record of arrays with the broadcast shape of the inputs
+        """
+        strike, spot, t, sigma, is_call = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in
+                                                                (strike, spot, t, sigma)), np.asarray(is_call, bool))
+        shape = strike.shape
+        inputs = np.round(np.stack([x.ravel() for x in (strike, spot, t, sigma)]), self.decimals)
+        r, q = round(r, self.decimals), round(q, self.decimals)
+        keys = zip(is_call.ravel().tolist(), *inputs.tolist(), repeat(r), repeat(q))
+
+        out = np.empty((inputs.shape[1], len(Greeks._fields)))
+        hit_rows, hit_values = [], []
+        # distinct missing key -> code, rows and codes of every missing contract
+        missing, miss_rows, miss_codes = {}, [], []
+        get, move_to_end = self._data.get, self._data.move_to_end
+        with self._lock:
+            for i, key in enumerate(keys):
+                values = get(key)
+                if values is None:
+                    miss_rows.append(i)
+                    miss_codes.append(missing.setdefault(key, len(missing)))
+                else:
+                    move_to_end(key)
+                    hit_rows.append(i)
+                    hit_values.append(values)
+            self.hits += len(hit_rows)
+            self.misses += len(miss_rows)
+
+        if hit_rows:
+            out[hit_rows] = hit_values
+        if missing:
+            # one row per distinct key, its rounded inputs are the key
+            first = np.empty(len(missing), dtype=np.intp)
+            first[miss_codes] = miss_rows
+            new = np.column_stack(Options(*inputs[:, first], r=r, q=q).greeks(is_call.ravel()[first]))
+            out[miss_rows] = new[miss_codes]
+            with self._lock:
+                for key, values in zip(missing, map(tuple, new.tolist())):
+                    self._put(key, values)
+
+        return Greeks(*(out[:, j].reshape(shape)[()] for j in range(out.shape[1])))
+
+    def stats(self) -> dict:
+        """
+        :return: hits, misses, evictions, size and hit rate
+        """
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self._data),
+                'max_size': self.max_size, 'hit_rate': self.hits / total if total else 0.0}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
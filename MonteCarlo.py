@@ -0,0 +1,153 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import NamedTuple
+
+import numpy as np
+
+from Option import Options
+
+# payoffs of MonteCarloPricer
+PAYOFFS = ('european', 'asian')
+N_SUMS = 6  # samples, sum y, sum y^2, sum x, sum x^2, sum xy (y discounted payoff, x control)
+
+
+class MCResult(NamedTuple):
+    """
+    Estimate of MonteCarloPricer.price
+    """
+    price: float
+    std_error: float
+    ci_low: float
+    ci_high: float
+    paths: int
+    seconds: float
+    paths_per_s: float
+
+
+def _simulate(seed: np.random.SeedSequence, n_paths: int, strike: float, spot: float, t: float, sigma: float,
+              sign: float, r: float, q: float, steps: int, payoff: str, antithetic: bool) -> np.ndarray:
+    """
+    Worker task: simulate one chunk of GBM paths
+    :return: N_SUMS sums of the chunk, an antithetic pair counts as one sample
+    """
+    rng = np.random.default_rng(seed)
+    dt = t / steps
+    z = rng.standard_normal((n_paths // 2 if antithetic else n_paths, steps))
+    if antithetic:
+        z = np.concatenate([z, -z])
+
+    log_paths = np.cumsum((r - q - sigma ** 2 / 2) * dt + sigma * np.sqrt(dt) * z, axis=1)
+    stock = spot * np.exp(log_paths)
+    terminal = stock[:, -1]
+    disc = np.exp(-r * t)
+    if payoff == 'asian':
+        y = disc * np.maximum(sign * (stock.mean(axis=1) - strike), 0)
+        # control: the European payoff, its expectation is the BSM price
+        x = disc * np.maximum(sign * (terminal - strike), 0)
+    else:
+        y = disc * np.maximum(sign * (terminal - strike), 0)
+        # control: the discounted stock, its expectation is spot * exp(-q * t)
+        x = disc * terminal
+
+    if antithetic:
+        half = len(y) // 2
+        y, x = (y[:half] + y[half:]) / 2, (x[:half] + x[half:]) / 2
+    return np.array([len(y), y.sum(), (y * y).sum(), x.sum(), (x * x).sum(), (x * y).sum()])
+
+
+class MonteCarloPricer:
+    """
+    Monte Carlo pricer on geometric Brownian motion paths, same conventions as Options (r, q, sigma, t in years)
+    The paths are simulated in chunks of chunk_paths so memory is bounded, the chunks can be spread over a process
+    pool. Each chunk has its own random stream spawned from the seed (numpy SeedSequence), so the result only depends
+    on the seed and the chunk size, not on the number of workers
+    european: terminal payoff, the control variate is the discounted stock (known forward)
+    asian: arithmetic average of the steps, the control variate is the European payoff priced with the BSM formula
+    Attributes
+    ==========
+    paths: number of simulated paths (even with antithetic)
+    chunk_paths: number of paths per chunk (even with antithetic)
+    steps: number of time steps per path (1 is exact for the European payoff)
+    payoff: european or asian
+    antithetic: simulate z and -z
+    control_variate: control variate adjustment of the estimate
+    workers: number of processes (1 runs the chunks in the calling process)
+    seed: root seed of the random streams
+    confidence: level of the confidence interval
+
+    """
+
+    def __init__(self, paths: int = 1_000_000, chunk_paths: int = 100_000, steps: int = 1, payoff: str = 'european',
+                 antithetic: bool = True, control_variate: bool = True, workers: int = 1, seed: int = 0,
+                 confidence: float = 0.95):
+        if payoff not in PAYOFFS:
+            raise ValueError(f"Unknown payoff {payoff}, use one of {', '.join(PAYOFFS)}")
+        if antithetic and (paths % 2 or chunk_paths % 2):
+            raise ValueError(f"Antithetic pairs need an even number of paths and chunk paths, got {paths} and "
+                             f"{chunk_paths}")
+        self.paths = paths
+        self.chunk_paths = chunk_paths
+        self.steps = steps
+        self.payoff = payoff
+        self.antithetic = antithetic
+        self.control_variate = control_variate
+        self.workers = workers or os.cpu_count()
+        self.seed = seed
+        self.confidence = confidence
+
+    def _control_mean(self, strike: float, spot: float, t: float, sigma: float, is_call: bool, r: float,
+                      q: float) -> float:
+        if self.payoff == 'asian':
+            return float(Options(strike, spot, t, sigma, r, q).greeks(is_call).price)
+        return spot * np.exp(-q * t)
+
+    def price(self, strike: float, spot: float, t: float, sigma: float, option_type: str, r: float = 0.05,
+              q: float = 0.04) -> MCResult:
+        """
+        :param strike: strike price
+        :param spot: stock price
+        :param t: time to maturity (in year fractions)
+        :param sigma: volatility
+        :param option_type: 'CALL' or 'PUT'
+        :param r: constant risk-free short rate
+        :param q: yield of the dividend
+        :return: MCResult with the price, its standard error and confidence interval, and the speed
+        """
+        if option_type not in ('CALL', 'PUT'):
+            raise ValueError(f"Option type should be either CALL or PUT, got {option_type!r}")
+        is_call = option_type == 'CALL'
+        sign = 1.0 if is_call else -1.0
+
+        start = time.perf_counter()
+        sizes = [min(self.chunk_paths, self.paths - s) for s in range(0, self.paths, self.chunk_paths)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+        args = [(seed, n, strike, spot, t, sigma, sign, r, q, self.steps, self.payoff, self.antithetic)
+                for seed, n in zip(seeds, sizes)]
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                sums = list(pool.map(_simulate, *zip(*args)))
+        else:
+            sums = [_simulate(*a) for a in args]
+
+        # chunks merged in order, the same sums whatever the number of workers
+        n, sy, syy, sx, sxx, sxy = np.sum(sums, axis=0)
+        mean_y = sy / n
+        var_y = syy / n - mean_y ** 2
+        estimate, variance = mean_y, var_y
+        if self.control_variate:
+            mean_x = sx / n
+            var_x = sxx / n - mean_x ** 2
+            cov = sxy / n - mean_x * mean_y
+            if var_x > 0:
+                beta = cov / var_x
+                estimate = mean_y - beta * (mean_x - self._control_mean(strike, spot, t, sigma, is_call, r, q))
+                variance = var_y - cov ** 2 / var_x
+
+        std_error = float(np.sqrt(max(variance, 0) / (n - 1)))
+        z = NormalDist().inv_cdf((1 + self.confidence) / 2)
+        seconds = time.perf_counter() - start
+        paths = int(n) * (2 if self.antithetic else 1)
+        return MCResult(float(estimate), std_error, float(estimate - z * std_error), float(estimate + z * std_error),
+                        paths, seconds, paths / seconds)
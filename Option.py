@@ -1,12 +1,58 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from random import randrange
+from typing import TYPE_CHECKING, NamedTuple
 import numpy as np
-from scipy.stats import norm
-import bs4 as bs
-import pandas as pd
-import requests
-import yfinance as yf
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
+
+from Instrument import metrics
+from Valuation import ValuationDate
+
+# pricing engines: closed-form BSM (European), CRR and Leisen-Reimer binomial trees (American, Lattice module)
+ENGINES = ('bsm', 'crr', 'lr')
+
+# option chain columns (Provider.CHAIN_COLUMNS) -> columns of Options.get_option
+CHAIN_RENAME = {'contractSymbol': 'Contract Symbol', 'strike': 'Strike', 'impliedVolatility': 'Volatility',
+                'bid': 'Bid', 'ask': 'Ask', 'volume': 'Volume', 'currency': 'Currency'}
+# compact dtypes of the full chain mode, the float columns are optionally stored as float32
+CATEGORY_COLUMNS = ['Ticker', 'Type', 'Currency']
+FLOAT_COLUMNS = ['Spot', 'Strike', 'Volatility', 'Bid', 'Ask', 'Volume']
+
+# scipy, pandas, matplotlib and the market data libraries are imported on first use (fast GUI startup)
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from Provider import MarketDataProvider
+
+
+class Greeks(NamedTuple):
+    """
+    Price and Greeks of one option (floats) or of a whole portfolio (arrays), as returned by Options.greeks
+    """
+    price: float
+    delta: float
+    gamma: float
+    vega: float
+    theta: float
+
+    def round(self, price_decimals: int = 3, greek_decimals: int = 4) -> 'Greeks':
+        """
+        Presentation rounding, same precision as the bsm/delta/gamma/vega/theta methods by default
+        :param price_decimals: decimals kept on the price
+        :param greek_decimals: decimals kept on the Greeks
+        :return: rounded copy of the record
+        """
+        return Greeks(np.round(self.price, price_decimals), *(np.round(g, greek_decimals) for g in self[1:]))
+
+
+class ImpliedVol(NamedTuple):
+    """
+    Result of Options.implied_volatility, one element per quote
+    """
+    sigma: np.ndarray
+    iterations: np.ndarray
+    not_converged: np.ndarray
 
 
 class Options:
@@ -23,7 +69,8 @@ class Options:
 
     """
 
-    def __init__(self, strike: float, spot: float, t: float, sigma: float, r: float = 0.05, q: float = 0.04):
+    def __init__(self, strike: float, spot: float, t: float, sigma: float, r: float = 0.05, q: float = 0.04,
+                 d1: float = None):
         self.strike = strike
         self.spot = spot
         self.r = r
@@ -31,13 +78,19 @@ class Options:
         self.t = t
         self.sigma = sigma
 
-        # private
-        self._d1 = self.d1()
+        # private: d1 can be given when the caller keeps its terms (Portfolio)
+        self._d1 = self.d1() if d1 is None else d1
         self._d2 = self.d2()
 
     @staticmethod
     def n(x):
-        return norm.cdf(x)
+        from scipy.special import ndtr
+
+        return ndtr(x)
+
+    @staticmethod
+    def pdf(x):
+        return np.exp(-x ** 2 / 2) / np.sqrt(2 * np.pi)
 
     def d1(self) -> float:
         return (np.log(self.spot / self.strike) + (self.r - self.q + 0.5 * self.sigma ** 2) * self.t) / (
@@ -85,7 +138,7 @@ class Options:
         Gamma measure the change on delta when the stock price change (convexity)
         :return: gama of the option
         """
-        gamma = np.exp(-self.q * self.t) * norm.pdf(self._d1) / self.spot * self.sigma * np.sqrt(self.t)
+        gamma = np.exp(-self.q * self.t) * self.pdf(self._d1) / (self.spot * self.sigma * np.sqrt(self.t))
         return gamma.round(4)
 
     def vega(self) -> float:
@@ -93,7 +146,7 @@ class Options:
         Vega measures the change in the option price per percentage point change in the volatility
         :return: vega of the option
         """
-        vega = self.spot * np.exp(-self.q * self.t) * np.sqrt(self.t) * norm.pdf(self._d1) / 100
+        vega = self.spot * np.exp(-self.q * self.t) * np.sqrt(self.t) * self.pdf(self._d1) / 100
         return vega.round(4)
 
     def theta(self, option_type: str) -> float:
@@ -104,17 +157,121 @@ class Options:
         try:
             if option_type == 'CALL':
                 theta = (self.q * self.spot * np.exp(-self.q * self.t) * self.n(
-                    self._d1) - self.r * self.strike * np.exp(-self.r * self.t) * self.n(self._d2) - norm.pdf(
-                    self._d1) * self.spot * self.sigma * np.exp(-self.q * self.t) / 2 * np.sqrt(self.t)) / 365
+                    self._d1) - self.r * self.strike * np.exp(-self.r * self.t) * self.n(self._d2) - self.pdf(
+                    self._d1) * self.spot * self.sigma * np.exp(-self.q * self.t) / (2 * np.sqrt(self.t))) / 365
             elif option_type == 'PUT':
                 theta = (self.r * self.strike * np.exp(-self.r * self.t) * self.n(
-                    -self._d2) - self.q * self.spot * np.exp(-self.q * self.t) * self.n(-self._d1) - norm.pdf(
-                    self._d1) * self.spot * self.sigma * np.exp(-self.q * self.t) / 2 * np.sqrt(self.t)) / 365
+                    -self._d2) - self.q * self.spot * np.exp(-self.q * self.t) * self.n(-self._d1) - self.pdf(
+                    self._d1) * self.spot * self.sigma * np.exp(-self.q * self.t) / (2 * np.sqrt(self.t))) / 365
             return theta.round(4)
         except Exception as e:
             print(f"{e} \n"
                   f"Option type missing, please enter the option type. It should be a string")
 
+    def greeks(self, option_type) -> Greeks:
+        """
+        Compute the price and every Greek in one pass, sharing the discount factors and the cdf/pdf terms.
+        Results are not rounded, use Greeks.round for display
+        :param option_type: 'CALL' or 'PUT', or a boolean array (True for calls) when the attributes are arrays
+        :return: Greeks record with price, delta, gamma, vega and theta
+        """
+        if isinstance(option_type, str):
+            if option_type not in ('CALL', 'PUT'):
+                raise ValueError(f"Option type should be either CALL or PUT, got {option_type!r}")
+            option_type = option_type == 'CALL'
+
+        # +1 for calls, -1 for puts: N(sign * d) gives N(d) for calls and N(-d) for puts
+        sign = np.where(option_type, 1.0, -1.0)
+        sqrt_t = np.sqrt(self.t)
+        disc_q = np.exp(-self.q * self.t)
+        disc_r = np.exp(-self.r * self.t)
+        n_d1 = self.n(sign * self._d1)
+        n_d2 = self.n(sign * self._d2)
+        pdf_d1 = self.pdf(self._d1)
+
+        spot_q = self.spot * disc_q * n_d1
+        strike_r = self.strike * disc_r * n_d2
+
+        price = sign * (spot_q - strike_r)
+        delta = sign * disc_q * n_d1
+        gamma = disc_q * pdf_d1 / (self.spot * self.sigma * sqrt_t)
+        vega = self.spot * disc_q * sqrt_t * pdf_d1 / 100
+        theta = (sign * (self.q * spot_q - self.r * strike_r)
+                 - pdf_d1 * self.spot * self.sigma * disc_q / (2 * sqrt_t)) / 365
+
+        return Greeks(price, delta, gamma, vega, theta)
+
+    @staticmethod
+    def implied_volatility(price, strike, spot, t, option_type, r: float = 0.05, q: float = 0.04,
+                           tol: float = 1e-8, max_iter: int = 100, sigma_bounds: tuple = (1e-6, 5.0)) -> ImpliedVol:
+        """
+        Implied volatility of a whole chain of quotes in one vectorized call.
+        Safeguarded Newton on the BSM price using vega, each quote keeps a [low, high] bracket and falls back to a
+        bisection step whenever the Newton step leaves it (or vega vanishes). Only the quotes that are still
+        running are repriced at each iteration
+        :param price: option prices (e.g. mid quotes)
+        :param strike: strike prices
+        :param spot: stock prices
+        :param t: times to maturity (in year fractions)
+        :param option_type: 'CALL' or 'PUT', or a boolean array (True for calls)
+        :param r: constant risk-free short rate
+        :param q: yield of the dividend
+        :param tol: absolute tolerance on the price
+        :param max_iter: maximum number of iterations
+        :param sigma_bounds: initial bracket of the volatility
+        :return: ImpliedVol with the volatilities (nan where not converged), iteration counts and non-converged mask
+        """
+        price, strike, spot, t = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (price, strike, spot, t)))
+        if isinstance(option_type, str):
+            if option_type not in ('CALL', 'PUT'):
+                raise ValueError(f"Option type should be either CALL or PUT, got {option_type!r}")
+            option_type = option_type == 'CALL'
+        is_call = np.broadcast_to(np.asarray(option_type, dtype=bool), price.shape)
+        shape = price.shape
+        price, strike, spot, t, is_call = (x.ravel() for x in (price, strike, spot, t, is_call))
+
+        sigma = np.full(price.shape, np.nan)
+        iterations = np.zeros(price.shape, dtype=np.int64)
+        not_converged = np.ones(price.shape, dtype=bool)
+
+        # no-arbitrage bounds, quotes outside of them have no implied volatility
+        fwd_spot = spot * np.exp(-q * t)
+        fwd_strike = strike * np.exp(-r * t)
+        lower = np.maximum(np.where(is_call, fwd_spot - fwd_strike, fwd_strike - fwd_spot), 0)
+        upper = np.where(is_call, fwd_spot, fwd_strike)
+        idx = np.flatnonzero((price > lower) & (price < upper) & (t > 0))
+
+        low = np.full(idx.shape, sigma_bounds[0])
+        high = np.full(idx.shape, sigma_bounds[1])
+        # Manaster-Koehler starting point
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vol = np.sqrt(2 * np.abs(np.log(spot[idx] / strike[idx]) + (r - q) * t[idx]) / t[idx])
+        vol = np.where((vol > low) & (vol < high), vol, 0.2)
+
+        for n_iter in range(1, max_iter + 1):
+            if idx.size == 0:
+                break
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                res = Options(strike[idx], spot[idx], t[idx], vol, r, q).greeks(is_call[idx])
+                diff = res.price - price[idx]
+                done = np.abs(diff) < tol
+
+                # price is increasing in sigma: tighten the bracket around the root
+                high = np.where(diff > 0, vol, high)
+                low = np.where(diff < 0, vol, low)
+                newton = vol - diff / (res.vega * 100)
+                bisect = ~np.isfinite(newton) | (newton <= low) | (newton >= high)
+                new_vol = np.where(bisect, 0.5 * (low + high), newton)
+
+            sigma[idx[done]] = vol[done]
+            iterations[idx] = n_iter
+            not_converged[idx[done]] = False
+
+            keep = ~done
+            idx, low, high, vol = idx[keep], low[keep], high[keep], new_vol[keep]
+
+        return ImpliedVol(sigma.reshape(shape), iterations.reshape(shape), not_converged.reshape(shape))
+
     def intrinsic_value(self, option_type: str) -> list:
         """
         Give an approximate intrinsic value of the option and the status based on the intrinsic value
@@ -132,77 +289,306 @@ class Options:
         return [status, round(value, 2)]
 
     @staticmethod
-    def retrieve_ticker() -> list:
+    def moneyness(strike, spot, is_call) -> np.ndarray:
         """
-        get sp100 stock ticker from wikipedia
-        :return: list of stocks ticker
+        Vectorized status of intrinsic_value
+        :param strike: strike prices
+        :param spot: stock prices
+        :param is_call: boolean array, True for calls
+        :return: array of 'In the Money', 'At the Money' or 'Out of the Money'
         """
-        # get the ticker from wikipedia ETF S&P 100 page
-        r = requests.get("https://en.wikipedia.org/wiki/S%26P_100#Components")
-        soup = bs.BeautifulSoup(r.text, 'lxml')
-        table = soup.find('table', {'class': 'wikitable', 'id': 'constituents'})
-        tickers = []
+        value = np.asarray(strike) - np.asarray(spot)
+        return np.select([(is_call & (value < 0)) | (~is_call & (value > 0)), value == 0],
+                         ['In the Money', 'At the Money'], default='Out of the Money')
 
-        for i in table.findAll('tr')[1:]:
-            for x in i.findAll('td'):
-                ticker = x.get_text()
-                tickers.append(ticker)
-                break
+    @staticmethod
+    def batch_inputs(data: pd.DataFrame, valuation: ValuationDate = None) -> tuple:
+        """
+        Pricing inputs of a portfolio as arrays
+        :param data: dataframe with Strike, Spot, Maturity (YYYY-MM-DD), Type and Volatility columns
+        :param valuation: valuation date and day count, ValuationDate() (now, ACT/365) by default
+        :return: strike, spot, t (in year fractions), sigma and is_call (True for calls) arrays
+        """
+        strike = data['Strike'].to_numpy(dtype=float)
+        spot = data['Spot'].to_numpy(dtype=float)
+        sigma = data['Volatility'].to_numpy(dtype=float)
+        t = (valuation or ValuationDate()).year_fractions(data['Maturity'])
+        is_call = (data['Type'].str.upper() == 'CALL').to_numpy()
+        return strike, spot, t, sigma, is_call
 
-        tickers = [i.replace('\n', '') for i in tickers]
+    @staticmethod
+    def price_batch(data: pd.DataFrame, r: float = 0.05, q: float = 0.04, rounded: bool = True,
+                    valuation: ValuationDate = None, workers: int = 1, chunksize: int = 250_000,
+                    cache=None, engine: str = 'bsm', steps: int = 500, pricer=None) -> pd.DataFrame:
+        """
+        Price a whole portfolio in one broadcast pass instead of one Options object per row
+        :param data: dataframe with Strike, Spot, Maturity (YYYY-MM-DD), Type and Volatility columns
+        :param r: constant risk-free short rate
+        :param q: yield of the dividend
+        :param rounded: round the results like the scalar methods (3 decimals on price, 4 on Greeks)
+        :param valuation: valuation date and day count, ValuationDate() by default (share one to price several
+        chunks at the same date)
+        :param workers: number of processes, above 1 the portfolio is split across a process pool (Parallel module)
+        :param chunksize: number of contracts per task of the process pool
+        :param cache: optional Memo.PricingCache, only the contracts missing from the cache are computed
+        :param engine: bsm (European closed form), crr or lr (American binomial trees), cache and workers only apply
+        to bsm
+        :param steps: number of time steps of the binomial trees
+        :param pricer: optional Parallel.ParallelPricer already started, its process pool is reused (e.g. across the
+        chunks of a file) instead of starting one per call, workers and chunksize are then ignored
+        :return: dataframe (same index as data) with Price, Delta, Gamma, Vega, Theta and Status columns
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine}, use one of {', '.join(ENGINES)}")
+        with metrics.span('pricing'):
+            strike, spot, t, sigma, is_call = Options.batch_inputs(data, valuation)
+
+            if engine != 'bsm':
+                from Lattice import BinomialTree
+
+                res = BinomialTree(steps=steps, method=engine.upper()).greeks(strike, spot, t, sigma, is_call, r=r, q=q)
+            elif cache is not None:
+                res = cache.greeks_batch(strike, spot, t, sigma, is_call, r=r, q=q)
+            elif pricer is not None:
+                res = pricer.greeks(strike, spot, t, sigma, is_call, r=r, q=q)
+            elif workers > 1:
+                from Parallel import ParallelPricer
+
+                with ParallelPricer(workers=workers, chunksize=chunksize) as pricer:
+                    res = pricer.greeks(strike, spot, t, sigma, is_call, r=r, q=q)
+            else:
+                res = Options(strike=strike, spot=spot, t=t, sigma=sigma, r=r, q=q).greeks(is_call)
+            if rounded:
+                res = res.round()
+
+            status = Options.moneyness(strike, spot, is_call)
+        metrics.count('contracts_priced', len(data))
+
+        import pandas as pd
+
+        return pd.DataFrame({
+            'Price': res.price,
+            'Delta': res.delta,
+            'Gamma': res.gamma,
+            'Vega': res.vega,
+            'Theta': res.theta,
+            'Status': status
+        }, index=data.index)
 
-        # get the spot of each stocks from yahoo finance
-        spots = (yf.download(tickers, interval="1m")['Adj Close'].iloc[-1, :]).reset_index()
-        while spots.isnull().sum().sum() >= 5:
-            print(f'{spots.isnull().sum().sum()} missing values')
-            spots = (yf.download(tickers)['Adj Close'].iloc[-1, :]).reset_index()
-        stock_price = list(spots.dropna().itertuples(index=False, name=None))
+    @staticmethod
+    def retrieve_ticker(provider: MarketDataProvider = None) -> list:
+        """
+        get sp100 stock ticker from wikipedia
+        :param provider: market data provider, YahooProvider by default
+        :return: list of stocks ticker
+        """
+        from Provider import YahooProvider
 
-        return stock_price
+        return (provider or YahooProvider()).retrieve_ticker()
 
     @staticmethod
-    def get_spot(ticker_list: list) -> float:
+    def get_spot(ticker_list: list, provider: MarketDataProvider = None) -> float:
         """
         get spot price of a stocks list
         :param ticker_list: list of stock ticker
+        :param provider: market data provider, YahooProvider by default
         :return: dataframe with stocks and spots
         """
-        spot = yf.download(ticker_list)['Adj Close'].iloc[-1]
-        return spot.round(2)
+        from Provider import YahooProvider
+
+        return (provider or YahooProvider()).get_spot(ticker_list)
 
     @staticmethod
-    def get_option(stock_price) -> pd.DataFrame:
+    def option_rows(ticker: str, spot: float, provider: MarketDataProvider = None) -> list:
         """
-        Get the option characteristics from yahoo finance (s, k, t, sigma)
-        :param stock_price: list of tuple with stock's ticker and price
-        :return: dataframe with the options data
+        Get the first call and the first put of a random maturity for one stock, with a single option chain request
+        :param ticker: stock ticker
+        :param spot: stock price
+        :param provider: market data provider, YahooProvider by default
+        :return: list of dict, one per option
         """
+        if provider is None:
+            from Provider import YahooProvider
+
+            provider = YahooProvider()
+        maturity = provider.maturities(ticker)
+        if len(maturity) == 0:
+            raise ValueError(f"No option listed for {ticker}")
+        exp = maturity[randrange(len(maturity))]
+        chain = provider.option_chain(ticker, exp)
+
         option_data = []
-        for t, s in stock_price:
-            try:
-                maturity = yf.Ticker(str(t)).options
-                exp = maturity[randrange(len(maturity))]
-            except ValueError:
-                continue
-
-            for option_type in ['calls', 'puts']:
-                opt = getattr(yf.Ticker(str(t)).option_chain(exp), option_type)
-                for row in opt.itertuples():
-                    type_op = 'call' if option_type == 'calls' else 'put'
-                    option_data.append({
-                        'Ticker': t,
-                        'Spot': s,
-                        'Maturity': exp,
-                        'Type': type_op,
-                        'Contract Symbol': row.contractSymbol,
-                        'Strike': row.strike,
-                        'Volatility': row.impliedVolatility,
-                        'Volume': row.volume,
-                        'Currency': row.currency
-                    })
+        for option_type in ['calls', 'puts']:
+            opt = chain[chain['optionType'] == option_type]
+            for row in opt.itertuples():
+                type_op = 'call' if option_type == 'calls' else 'put'
+                option_data.append({
+                    'Ticker': ticker,
+                    'Spot': spot,
+                    'Maturity': exp,
+                    'Type': type_op,
+                    'Contract Symbol': row.contractSymbol,
+                    'Strike': row.strike,
+                    'Volatility': row.impliedVolatility,
+                    'Bid': row.bid,
+                    'Ask': row.ask,
+                    'Volume': row.volume,
+                    'Currency': row.currency
+                })
+                break
+
+        return option_data
+
+    @staticmethod
+    def option_chain_frame(ticker: str, spot: float, provider: MarketDataProvider = None,
+                           maturities: list = None, float32: bool = False) -> pd.DataFrame:
+        """
+        Every call and put of every maturity of one stock, the chain frames are concatenated column-wise (no row loop)
+        :param ticker: stock ticker
+        :param spot: stock price
+        :param provider: market data provider, YahooProvider by default
+        :param maturities: maturities to download (YYYY-MM-DD), all the listed ones by default
+        :param float32: float32 numeric columns
+        :return: dataframe with the columns of option_rows and the compact dtypes of compact_chain
+        """
+        import pandas as pd
+
+        if provider is None:
+            from Provider import YahooProvider
+
+            provider = YahooProvider()
+        maturity = provider.maturities(ticker) if maturities is None else list(maturities)
+        if len(maturity) == 0:
+            raise ValueError(f"No option listed for {ticker}")
+        chains = [provider.option_chain(ticker, exp) for exp in maturity]
+        chain = pd.concat(chains, ignore_index=True)
+
+        return Options.compact_chain(pd.DataFrame({
+            'Ticker': ticker,
+            'Spot': float(spot),
+            'Maturity': np.repeat(np.array(maturity, dtype='datetime64[ns]'), [len(c) for c in chains]),
+            'Type': pd.Categorical.from_codes((chain['optionType'].to_numpy() == 'puts').astype(np.int8),
+                                              ['call', 'put']),
+            **{name: chain[column].to_numpy() for column, name in CHAIN_RENAME.items()}
+        }), float32)
+
+    @staticmethod
+    def compact_chain(data: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+        """
+        :param data: dataframe from Options.get_option
+        :param float32: store Spot, Strike, Volatility, Bid, Ask and Volume as float32 (half the memory, about 7
+        significant digits)
+        :return: data with categorical Ticker, Type and Currency and datetime64 Maturity
+        """
+        import pandas as pd
+
+        columns = {c: data[c].astype('category') for c in CATEGORY_COLUMNS if c in data}
+        if 'Maturity' in data:
+            columns['Maturity'] = pd.to_datetime(data['Maturity'], format='%Y-%m-%d')
+        if float32:
+            columns.update({c: data[c].astype(np.float32) for c in FLOAT_COLUMNS if c in data})
+        return data.assign(**columns)
+
+    @staticmethod
+    def memory_footprint(data: pd.DataFrame) -> dict:
+        """
+        :param data: any dataframe
+        :return: rows, bytes in memory (strings included), bytes per row and bytes per column
+        """
+        usage = data.memory_usage(deep=True)
+        total = int(usage.sum())
+        return {'rows': len(data), 'bytes': total, 'bytes_per_row': total / len(data) if len(data) else 0.0,
+                'columns': {str(c): int(b) for c, b in usage.items()}}
+
+    @staticmethod
+    def get_option(stock_price, max_workers: int = 8, timeout: float = 30.0,
+                   provider: MarketDataProvider = None, callback=None, cancel=None, full_chain: bool = False,
+                   float32: bool = False, collect: bool = True) -> pd.DataFrame:
+        """
+        Get the option characteristics from yahoo finance (s, k, t, sigma), the tickers are downloaded concurrently
+        By default one call and one put of a random maturity per stock, every maturity and strike with full_chain
+        :param stock_price: list of tuple with stock's ticker and price
+        :param max_workers: maximum number of tickers downloaded at the same time (1 for a sequential download)
+        :param timeout: maximum time in seconds spent on one ticker
+        :param provider: market data provider, YahooProvider by default
+        :param callback: optional function called with (ticker, rows, error) as soon as a ticker is finished, rows is
+        a list of dict or a dataframe with full_chain
+        :param cancel: optional threading.Event, the download stops (keeping the finished tickers) once it is set
+        :param full_chain: download every maturity of every ticker, the chains are concatenated with compact dtypes
+        (see compact_chain)
+        :param float32: float32 numeric columns in full_chain mode
+        :param collect: keep the rows of every ticker for the returned dataframe, False when the callback consumes
+        them (the returned dataframe is then empty, with the attrs)
+        :return: dataframe with the options data, the errors per ticker are kept in df.attrs['errors'] and the memory
+        footprint (see memory_footprint) in df.attrs['memory']
+        """
+        import pandas as pd
+
+        stock_price = list(stock_price)
+        if provider is None:
+            from Provider import YahooProvider
+
+            provider = YahooProvider()
+        results = {}
+        errors = {}
+        started = {}
+
+        def fetch(ticker, spot):
+            started[ticker] = time.monotonic()
+            with metrics.span('option_chain'), metrics.thread_profile():
+                if full_chain:
+                    return Options.option_chain_frame(ticker, spot, provider, float32=float32)
+                return Options.option_rows(ticker, spot, provider)
+
+        with metrics.span('get_option'):
+            pool = ThreadPoolExecutor(max_workers=max_workers)
+            futures = {pool.submit(fetch, t, s): t for t, s in stock_price}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=min(timeout, 0.5), return_when=FIRST_COMPLETED)
+                for future in done:
+                    # the finished futures are dropped so their rows are not kept when collect is False
+                    ticker = futures.pop(future)
+                    rows = []
+                    try:
+                        rows = future.result()
+                        metrics.count('tickers_fetched')
+                        metrics.count('contracts_fetched', len(rows))
+                        if collect:
+                            results[ticker] = rows
+                    except Exception as e:
+                        errors[ticker] = e
+                        metrics.count('tickers_failed')
+                    if callback is not None:
+                        callback(ticker, rows, errors.get(ticker))
+
+                now = time.monotonic()
+                for future in list(pending):
+                    ticker = futures[future]
+                    if ticker in started and now - started[ticker] > timeout:
+                        errors[ticker] = TimeoutError(f"{ticker} took more than {timeout}s")
+                        metrics.count('tickers_failed')
+                        pending.discard(future)
+                        if callback is not None:
+                            callback(ticker, [], errors[ticker])
+
+                if cancel is not None and cancel.is_set():
                     break
+            # do not wait for the downloads that timed out
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if errors:
+            print(f"{len(errors)} ticker(s) failed: " + ", ".join(f"{t} ({e})" for t, e in errors.items()))
 
-        return pd.DataFrame(option_data)
+        if full_chain:
+            chains = [results[t] for t, _ in stock_price if t in results]
+            df = Options.compact_chain(pd.concat(chains, ignore_index=True), float32) if chains else pd.DataFrame()
+        else:
+            option_data = [row for t, _ in stock_price if t in results for row in results[t]]
+            df = pd.DataFrame(option_data)
+        df.attrs['errors'] = errors
+        df.attrs['memory'] = Options.memory_footprint(df)
+        return df
 
 
 class Chart(Options):
@@ -210,59 +596,75 @@ class Chart(Options):
         super().__init__(parent)
 
     @staticmethod
-    def option_chart():
-        with PdfPages('Options_graph.pdf') as pdf:
-            with plt.style.context('seaborn-v0_8-darkgrid'):
-                spot = np.arange(1, 150)
-
-                # Greek plot
-
-                fig, axes = plt.subplots(5, 1, figsize=(10, 25))
-                fig.suptitle('Greeks', ha='center', fontweight='bold', fontsize=15)
-                fig.tight_layout(pad=7.0)
-                strike = [63, 87, 124]
-
-                for s in strike:
-                    del_call = [Options(float(s), float(x), 5.0, 0.1).delta('CALL') for x in spot]
-                    del_put = [Options(float(s), float(x), 5.0, 0.1).delta('PUT') for x in spot]
-                    axes[0].plot(del_call, linestyle='--', label=("Delta Call K=%s" % s))
-                    axes[0].plot(del_put, label=("Delta Put K=%s" % s))
+    def option_chart(path: str = 'Options_graph.pdf', strikes: tuple = (63, 87, 124), maturities: tuple = (5.0,),
+                     sigma: float = 0.1, spot_range: tuple = (1, 149), n_points: int = 149,
+                     price_strike: float = 87.0, price_maturity: float = 1.0, price_sigma: float = 0.5,
+                     r: float = 0.05, q: float = 0.04, cache=None):
+        """
+        Greeks and option value against the stock price, each curve is evaluated in one array computation over the
+        spot grid (strikes x maturities x spots broadcast)
+        :param path: pdf file
+        :param strikes: strikes of the Greek curves
+        :param maturities: maturities of the Greek curves (in year fractions)
+        :param sigma: volatility of the Greek curves
+        :param spot_range: first and last stock price of the grid
+        :param n_points: number of points of the spot grid
+        :param price_strike: strike of the option value plot
+        :param price_maturity: maturity of the option value plot
+        :param price_sigma: volatility of the option value plot
+        :param r: constant risk-free short rate
+        :param q: yield of the dividend
+        :param cache: optional Memo.PricingCache, a chart generated again is served from the cache
+        """
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
 
-                axes[0].set_ylabel('Delta')
-                axes[0].legend()
+        spot = np.linspace(spot_range[0], spot_range[1], n_points)
+        strike = np.asarray(strikes, dtype=float)
+        t = np.asarray(maturities, dtype=float)
 
-                for s in strike:
-                    gam = [Options(float(s), float(x), 5.0, 0.1).gamma() for x in spot]
-                    axes[1].plot(gam, linestyle='--', label=("Options Gamma K=%s" % s))
+        def greeks(strike_, spot_, t_, sigma_, is_call):
+            if cache is not None:
+                return cache.greeks_batch(strike_, spot_, t_, sigma_, is_call, r=r, q=q)
+            return Options(strike_, spot_, t_, sigma_, r, q).greeks(is_call)
 
-                axes[1].set_ylabel('Gamma')
-                axes[1].legend()
+        # shape (maturities, strikes, spots)
+        grid = (strike[None, :, None], spot[None, None, :], t[:, None, None], sigma)
+        call, put = greeks(*grid, True), greeks(*grid, False)
+        value = (price_strike, spot, price_maturity, price_sigma)
+        call_val, put_val = greeks(*value, True).price, greeks(*value, False).price
 
-                for s in strike:
-                    veg = [Options(float(s), float(x), 5.0, 0.1).vega() for x in spot]
-                    axes[2].plot(veg, label=("Options Vega K=%s" % s))
+        def label(name, i, j):
+            return f"{name} K={strikes[j]}" + (f" T={maturities[i]}" if len(maturities) > 1 else "")
 
-                axes[2].set_ylabel('Vega')
-                axes[2].set_title('Volatility = 0.1 ')
-                axes[2].legend()
+        with PdfPages(path) as pdf:
+            with plt.style.context('seaborn-v0_8-darkgrid'):
+                # Greek plot
 
-                for s in strike:
-                    theta_call = [Options(float(s), float(x), 5.0, 0.1).theta('CALL') for x in spot]
-                    theta_put = [Options(float(s), float(x), 5.0, 0.1).theta('PUT') for x in spot]
-                    axes[3].plot(theta_call, linestyle='--', label=("Theta Call K=%s" % s))
-                    axes[3].plot(theta_put, label=("Theta Put K=%s" % s))
+                fig, axes = plt.subplots(5, 1, figsize=(10, 25))
+                fig.suptitle('Greeks', ha='center', fontweight='bold', fontsize=15)
+                fig.tight_layout(pad=7.0)
 
-                axes[3].set_ylabel('Theta')
-                axes[3].set_title('Maturity = 5 years')
-                axes[3].legend()
+                for i in range(len(t)):
+                    for j in range(len(strike)):
+                        axes[0].plot(spot, call.delta[i, j], linestyle='--', label=label("Delta Call", i, j))
+                        axes[0].plot(spot, put.delta[i, j], label=label("Delta Put", i, j))
+                        axes[1].plot(spot, call.gamma[i, j], linestyle='--', label=label("Options Gamma", i, j))
+                        axes[2].plot(spot, call.vega[i, j], label=label("Options Vega", i, j))
+                        axes[3].plot(spot, call.theta[i, j], linestyle='--', label=label("Theta Call", i, j))
+                        axes[3].plot(spot, put.theta[i, j], label=label("Theta Put", i, j))
+
+                for ax, name in zip(axes[:4], ['Delta', 'Gamma', 'Vega', 'Theta']):
+                    ax.set_ylabel(name)
+                    ax.legend()
+                axes[2].set_title(f'Volatility = {sigma} ')
+                axes[3].set_title('Maturity = ' + ', '.join(f'{m:g}' for m in maturities) + ' years')
 
                 # Option plot
 
-                call_val = [Options(87.0, float(x), 1.0, 0.5).bsm('CALL') for x in spot]
-                put_val = [Options(87.0, float(x), 1.0, 0.5).bsm('PUT') for x in spot]
-
                 axes[4].set_title(f'Change in option value with stock price'
-                                  f'\n \n Strike: 87, t: 1 an, sigma: 0.5, r: 5%, q: 4%', fontweight="bold")
+                                  f'\n \n Strike: {price_strike:g}, t: {price_maturity:g} an, sigma: {price_sigma:g}, '
+                                  f'r: {r:.0%}, q: {q:.0%}', fontweight="bold")
                 axes[4].set_xlabel('Stock Price')
                 axes[4].set_ylabel("Option price")
                 axes[4].plot(spot, call_val, color='green', label='Call')
@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from Option import Greeks, Options
+
+N_INPUTS = 4  # strike, spot, t, sigma (+ the call mask stored after them)
+N_OUTPUTS = len(Greeks._fields)
+
+
+def _attach(name: str) -> SharedMemory:
+    """
+    Open a block created by the parent process, only the parent unlinks it
+    """
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:  # python < 3.13, the workers share the resource tracker of the parent
+        return SharedMemory(name=name)
+
+
+def _price_slice(in_name: str, out_name: str, n: int, start: int, stop: int, r: float, q: float):
+    """
+    Worker task: price the contracts [start, stop) of the shared input block into the shared output block
+    """
+    shm_in, shm_out = _attach(in_name), _attach(out_name)
+    try:
+        inputs = np.ndarray((N_INPUTS, n), dtype=np.float64, buffer=shm_in.buf)
+        is_call = np.ndarray((n,), dtype=np.bool_, buffer=shm_in.buf, offset=inputs.nbytes)
+        outputs = np.ndarray((N_OUTPUTS, n), dtype=np.float64, buffer=shm_out.buf)
+
+        strike, spot, t, sigma = inputs[:, start:stop]
+        res = Options(strike=strike, spot=spot, t=t, sigma=sigma, r=r, q=q).greeks(is_call[start:stop])
+        for i, values in enumerate(res):
+            outputs[i, start:stop] = values
+        # the views must be released before closing the blocks
+        del inputs, is_call, outputs, strike, spot, t, sigma
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+
+class ParallelPricer:
+    """
+    Price a portfolio with a process pool, inputs and outputs live in multiprocessing.shared_memory blocks so no
+    contract is pickled. Each worker runs the Options.greeks kernel on a slice, the results are identical to the
+    serial path
+    Attributes
+    ==========
+    workers: number of processes (os.cpu_count() by default)
+    chunksize: number of contracts per task
+
+    """
+
+    def __init__(self, workers: int = None, chunksize: int = 250_000):
+        self.workers = workers or os.cpu_count()
+        self.chunksize = chunksize
+
+        # private
+        self._pool = None
+
+    def __enter__(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def greeks(self, strike, spot, t, sigma, is_call, r: float = 0.05, q: float = 0.04) -> Greeks:
+        """
+        :param strike: strike prices
+        :param spot: stock prices
+        :param t: times to maturity (in year fractions)
+        :param sigma: volatilities
+        :param is_call: boolean array, True for calls
+        :param r: constant risk-free short rate
+        :param q: yield of the dividend
+        :return: Greeks record of arrays, same as Options(...).greeks(is_call)
+        """
+        strike, spot, t, sigma, is_call = np.broadcast_arrays(strike, spot, t, sigma,
+                                                              np.asarray(is_call, dtype=bool))
+        shape = strike.shape
+        n = strike.size
+        if self._pool is None:
+            with self:
+                return self.greeks(strike, spot, t, sigma, is_call, r, q)
+
+        shm_in = SharedMemory(create=True, size=max(N_INPUTS * n * 8 + n, 1))
+        shm_out = SharedMemory(create=True, size=max(N_OUTPUTS * n * 8, 1))
+        try:
+            inputs = np.ndarray((N_INPUTS, n), dtype=np.float64, buffer=shm_in.buf)
+            for i, values in enumerate((strike, spot, t, sigma)):
+                inputs[i] = values.ravel()
+            np.ndarray((n,), dtype=np.bool_, buffer=shm_in.buf, offset=inputs.nbytes)[:] = is_call.ravel()
+
+            tasks = [self._pool.submit(_price_slice, shm_in.name, shm_out.name, n, start,
+                                       min(start + self.chunksize, n), r, q) for start in range(0, n, self.chunksize)]
+            for task in tasks:
+                task.result()
+
+            outputs = np.ndarray((N_OUTPUTS, n), dtype=np.float64, buffer=shm_out.buf)
+            res = Greeks(*(outputs[i].reshape(shape).copy() for i in range(N_OUTPUTS)))
+            del inputs, outputs
+        finally:
+            for shm in (shm_in, shm_out):
+                shm.close()
+                shm.unlink()
+        return res
@@ -0,0 +1,109 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from Option import Greeks, Options
+from Valuation import ValuationDate
+
+
+class Portfolio:
+    """
+    In-memory portfolio repriced incrementally: an index from each ticker to its rows lets a spot or volatility
+    update reprice only the contracts of the names that moved
+    Attributes
+    ==========
+    data: dataframe from Options.get_option (Ticker, Spot, Maturity, Type, Strike, Volatility...)
+    r: constant risk-free short rate
+    q: yield of the dividend
+    valuation: valuation date and day count, ValuationDate() by default
+
+    """
+
+    def __init__(self, data: pd.DataFrame, r: float = 0.05, q: float = 0.04, valuation: ValuationDate = None):
+        self.data = data.reset_index(drop=True)
+        self.r = r
+        self.q = q
+        self.valuation = valuation or ValuationDate()
+
+        # pricing inputs, strike/t/type never change
+        self.strike, self.spot, self.t, self.sigma, self.is_call = Options.batch_inputs(self.data, self.valuation)
+        self.spot, self.sigma = self.spot.copy(), self.sigma.copy()
+
+        # ticker -> positions of its contracts
+        self.index = self.data.groupby('Ticker', sort=False).indices
+
+        # d1 = (ln S - ln K + (r - q + sigma^2 / 2) t) / (sigma sqrt(t)) kept in terms: a spot tick only changes
+        # ln S (one log per ticker), a volatility update only the drift and sigma sqrt(t) of its rows
+        self.log_strike = np.log(self.strike)
+        self.log_spot = np.log(self.spot)
+        self.drift = np.empty(len(self.data))
+        self.vol_sqrt_t = np.empty(len(self.data))
+        self._vol_terms(np.arange(len(self.data)))
+
+        # results of every contract
+        n = len(self.data)
+        self.results = Greeks(*(np.empty(n) for _ in Greeks._fields))
+        self.status = np.empty(n, dtype=object)
+        self._reprice(np.arange(n))
+
+    def rows(self, ticker: str) -> np.ndarray:
+        """
+        :param ticker: stock ticker
+        :return: positions of the contracts on the ticker
+        """
+        return self.index.get(ticker, np.array([], dtype=np.intp))
+
+    def _vol_terms(self, rows: np.ndarray):
+        sigma, t = self.sigma[rows], self.t[rows]
+        self.drift[rows] = (self.r - self.q + sigma ** 2 / 2) * t
+        self.vol_sqrt_t[rows] = sigma * np.sqrt(t)
+
+    def _reprice(self, rows: np.ndarray):
+        d1 = (self.log_spot[rows] - self.log_strike[rows] + self.drift[rows]) / self.vol_sqrt_t[rows]
+        op = Options(self.strike[rows], self.spot[rows], self.t[rows], self.sigma[rows], self.r, self.q, d1=d1)
+        for values, new in zip(self.results, op.greeks(self.is_call[rows])):
+            values[rows] = new
+        self.status[rows] = Options.moneyness(self.strike[rows], self.spot[rows], self.is_call[rows])
+
+    def update(self, spots: dict = None, vols: dict = None, vol_shifts: dict = None) -> np.ndarray:
+        """
+        Reprice only the contracts of the updated tickers, the time spent is proportional to their number of contracts
+        :param spots: new stock price per ticker
+        :param vols: new volatility per ticker, set on all its contracts (flattens the smile of the ticker)
+        :param vol_shifts: volatility change per ticker added to the current volatilities, one number (parallel shift,
+        keeps the smile) or an array with one shift per contract in the order of rows(ticker)
+        :return: positions of the repriced contracts
+        """
+        touched, vol_touched = [], []
+        for ticker, spot in (spots or {}).items():
+            rows = self.rows(ticker)
+            self.spot[rows] = spot
+            self.log_spot[rows] = math.log(spot)
+            touched.append(rows)
+        for ticker, vol in (vols or {}).items():
+            rows = self.rows(ticker)
+            self.sigma[rows] = vol
+            vol_touched.append(rows)
+        for ticker, shift in (vol_shifts or {}).items():
+            rows = self.rows(ticker)
+            self.sigma[rows] += shift
+            vol_touched.append(rows)
+
+        if vol_touched:
+            self._vol_terms(np.unique(np.concatenate(vol_touched)))
+        if not touched and not vol_touched:
+            return np.array([], dtype=np.intp)
+        rows = np.unique(np.concatenate(touched + vol_touched))
+        self._reprice(rows)
+        return rows
+
+    def to_frame(self, rounded: bool = True) -> pd.DataFrame:
+        """
+        :param rounded: round the results like the scalar methods
+        :return: portfolio data with the current Spot/Volatility and the Price, Delta, Gamma, Vega, Theta and Status
+        columns
+        """
+        res = self.results.round() if rounded else self.results
+        return self.data.assign(Spot=self.spot, Volatility=self.sigma, Price=res.price, Delta=res.delta,
+                                Gamma=res.gamma, Vega=res.vega, Theta=res.theta, Status=self.status)
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from Instrument import metrics
+
+# the live data libraries are only imported when YahooProvider goes online
+if TYPE_CHECKING:
+    import yfinance as yf
+
+# columns of an option chain returned by the providers (same names as yfinance)
+CHAIN_COLUMNS = ['contractSymbol', 'strike', 'impliedVolatility', 'bid', 'ask', 'volume', 'currency', 'optionType']
+
+
+class MarketDataProvider(ABC):
+    """
+    Interface of the market data used by the pricer
+    """
+
+    @abstractmethod
+    def retrieve_ticker(self) -> list:
+        """
+        :return: list of tuple with stock's ticker and price
+        """
+
+    @abstractmethod
+    def get_spot(self, ticker_list):
+        """
+        :param ticker_list: one ticker or a list of tickers
+        :return: last price(s)
+        """
+
+    @abstractmethod
+    def maturities(self, ticker: str) -> list:
+        """
+        :param ticker: stock ticker
+        :return: listed maturities (YYYY-MM-DD)
+        """
+
+    @abstractmethod
+    def option_chain(self, ticker: str, exp: str) -> pd.DataFrame:
+        """
+        :param ticker: stock ticker
+        :param exp: maturity (YYYY-MM-DD)
+        :return: calls and puts of the maturity, CHAIN_COLUMNS with optionType 'calls' or 'puts'
+        """
+
+
+class YahooProvider(MarketDataProvider):
+    """
+    Live data: S&P 100 components from wikipedia, prices and option chains from yahoo finance
+    """
+
+    def __init__(self):
+        # one yf.Ticker per stock, it keeps the maturities downloaded for the option chain request
+        self._tickers = {}
+
+    def _ticker(self, ticker: str) -> yf.Ticker:
+        ticker = str(ticker)
+        if ticker not in self._tickers:
+            import yfinance as yf
+
+            self._tickers[ticker] = yf.Ticker(ticker)
+        return self._tickers[ticker]
+
+    def retrieve_ticker(self) -> list:
+        import bs4 as bs
+        import requests
+        import yfinance as yf
+
+        # get the ticker from wikipedia ETF S&P 100 page
+        with metrics.span('scrape_tickers'):
+            r = requests.get("https://en.wikipedia.org/wiki/S%26P_100#Components")
+            soup = bs.BeautifulSoup(r.text, 'lxml')
+            table = soup.find('table', {'class': 'wikitable', 'id': 'constituents'})
+            tickers = []
+
+            for i in table.findAll('tr')[1:]:
+                for x in i.findAll('td'):
+                    ticker = x.get_text()
+                    tickers.append(ticker)
+                    break
+
+            tickers = [i.replace('\n', '') for i in tickers]
+
+        # get the spot of each stocks from yahoo finance
+        with metrics.span('download_spots'):
+            spots = (yf.download(tickers, interval="1m")['Adj Close'].iloc[-1, :]).reset_index()
+            while spots.isnull().sum().sum() >= 5:
+                print(f'{spots.isnull().sum().sum()} missing values')
+                metrics.count('download_retries')
+                spots = (yf.download(tickers)['Adj Close'].iloc[-1, :]).reset_index()
+        stock_price = list(spots.dropna().itertuples(index=False, name=None))
+
+        return stock_price
+
+    def get_spot(self, ticker_list):
+        import yfinance as yf
+
+        spot = yf.download(ticker_list)['Adj Close'].iloc[-1]
+        return spot.round(2)
+
+    def maturities(self, ticker: str) -> list:
+        return list(self._ticker(ticker).options)
+
+    def option_chain(self, ticker: str, exp: str) -> pd.DataFrame:
+        chain = self._ticker(ticker).option_chain(exp)
+        return pd.concat([chain.calls.assign(optionType='calls'), chain.puts.assign(optionType='puts')],
+                         ignore_index=True)
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic stand-in without network access, every ticker, price and chain only depends on the seed
+    Attributes
+    ==========
+    n_tickers: number of stocks (SYN0000, SYN0001...)
+    n_maturities: number of monthly maturities per stock
+    n_strikes: number of strikes per maturity (for calls and for puts)
+    seed: seed of the random generators
+    start: first day of the maturities (YYYY-MM-DD), today by default
+
+    """
+
+    def __init__(self, n_tickers: int = 100, n_maturities: int = 12, n_strikes: int = 50, seed: int = 0,
+                 start: str = None):
+        self.n_tickers = n_tickers
+        self.n_maturities = n_maturities
+        self.n_strikes = n_strikes
+        self.seed = seed
+        self.start = datetime.strptime(start, '%Y-%m-%d') if start else datetime.now().replace(
+            hour=0, minute=0, second=0, microsecond=0)
+
+    def _rng(self, *key) -> np.random.Generator:
+        return np.random.default_rng([self.seed, zlib.crc32('|'.join(map(str, key)).encode())])
+
+    def _spot(self, ticker: str) -> float:
+        return round(float(self._rng(ticker).uniform(20, 500)), 2)
+
+    def retrieve_ticker(self) -> list:
+        return [(f"SYN{i:04d}", self._spot(f"SYN{i:04d}")) for i in range(self.n_tickers)]
+
+    def get_spot(self, ticker_list):
+        if isinstance(ticker_list, str):
+            return self._spot(ticker_list)
+        return pd.Series({t: self._spot(t) for t in ticker_list})
+
+    def maturities(self, ticker: str) -> list:
+        return [(self.start + timedelta(days=30 * (i + 1))).strftime('%Y-%m-%d') for i in range(self.n_maturities)]
+
+    def option_chain(self, ticker: str, exp: str) -> pd.DataFrame:
+        from Option import Options
+
+        spot = self._spot(ticker)
+        rng = self._rng(ticker, exp)
+        t = max((datetime.strptime(exp, '%Y-%m-%d') - self.start).days, 1) / 365
+        strike = np.round(spot * np.linspace(0.5, 1.5, self.n_strikes), 1)
+        # volatility smile around the money
+        sigma = rng.uniform(0.15, 0.4) + 0.3 * np.log(strike / spot) ** 2
+        is_call = np.repeat([True, False], self.n_strikes)
+        strike, sigma = np.tile(strike, 2), np.tile(sigma, 2)
+        mid = Options(strike, spot, t, sigma).greeks(is_call).price
+        spread = 0.01 + 0.02 * mid
+
+        code = exp[2:].replace('-', '')
+        return pd.DataFrame({
+            'contractSymbol': [f"{ticker}{code}{'C' if c else 'P'}{int(k * 1000):08d}"
+                               for c, k in zip(is_call, strike)],
+            'strike': strike,
+            'impliedVolatility': sigma,
+            'bid': np.maximum(mid - spread / 2, 0).round(2),
+            'ask': (mid + spread / 2).round(2),
+            'volume': rng.integers(0, 5000, 2 * self.n_strikes).astype(float),
+            'currency': 'USD',
+            'optionType': np.where(is_call, 'calls', 'puts')
+        })
+
+    def portfolio(self, n_contracts: int) -> pd.DataFrame:
+        """
+        Portfolio of any size with the columns of Options.get_option, generated in one vectorized pass
+        :param n_contracts: number of options
+        :return: dataframe with the options data
+        """
+        rng = self._rng('portfolio', n_contracts)
+        tickers = np.array([t for t, _ in self.retrieve_ticker()])
+        spots = np.array([s for _, s in self.retrieve_ticker()])
+        maturities = np.array(self.maturities(''))
+
+        which = rng.integers(0, self.n_tickers, n_contracts)
+        spot = spots[which]
+        strike = np.round(spot * rng.uniform(0.5, 1.5, n_contracts), 1)
+        sigma = rng.uniform(0.15, 0.4, n_contracts) + 0.3 * np.log(strike / spot) ** 2
+        is_call = rng.random(n_contracts) < 0.5
+
+        return pd.DataFrame({
+            'Ticker': tickers[which],
+            'Spot': spot,
+            'Maturity': maturities[rng.integers(0, self.n_maturities, n_contracts)],
+            'Type': np.where(is_call, 'call', 'put'),
+            'Strike': strike,
+            'Volatility': sigma,
+            'Volume': rng.integers(0, 5000, n_contracts).astype(float),
+            'Currency': 'USD'
+        })
+
+
+class CachedProvider(MarketDataProvider):
+    """
+    Put a MarketCache in front of another provider
+    Attributes
+    ==========
+    provider: provider used when the cache has no fresh snapshot
+    cache: MarketCache
+
+    """
+
+    def __init__(self, provider: MarketDataProvider, cache):
+        self.provider = provider
+        self.cache = cache
+
+    def retrieve_ticker(self) -> list:
+        spots = self.cache.fetch('spots', 'sp100',
+                                 lambda: pd.DataFrame(self.provider.retrieve_ticker(), columns=['Ticker', 'Spot']))
+        return list(spots.itertuples(index=False, name=None))
+
+    def get_spot(self, ticker_list):
+        return self.provider.get_spot(ticker_list)
+
+    def maturities(self, ticker: str) -> list:
+        maturity = self.cache.fetch('expiries', ticker,
+                                    lambda: pd.DataFrame({'Maturity': self.provider.maturities(ticker)}))
+        maturity = maturity['Maturity'].tolist()
+        if self.cache.offline:
+            # only replay the maturities whose chain is in the snapshot
+            cached = self.cache.keys('chains')
+            maturity = [m for m in maturity if self.cache.clean_key(f"{ticker}_{m}") in cached]
+        return maturity
+
+    def option_chain(self, ticker: str, exp: str) -> pd.DataFrame:
+        return self.cache.fetch('chains', f"{ticker}_{exp}", lambda: self.provider.option_chain(ticker, exp))
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from Option import Greeks, Options
+from Valuation import ValuationDate
+
+
+class ScenarioGrid:
+    """
+    Revaluation of a whole portfolio on a grid of spot shocks x volatility shocks x time steps (x rate shifts),
+    computed by broadcasting over (scenarios, contracts) and chunked over the scenario axis to bound the memory
+    Attributes
+    ==========
+    spot_shocks: relative spot moves (e.g. -0.1 for -10%)
+    vol_shocks: absolute volatility moves (e.g. 0.05 for +5 vol points)
+    time_steps: time elapsed in year fractions (e.g. 1/365 for one day)
+    rate_shifts: absolute shifts of the risk-free rate
+    r: constant risk-free short rate
+    q: yield of the dividend
+    max_cells: maximum number of scenario x contract values computed at once
+
+    """
+
+    def __init__(self, spot_shocks=(0.0,), vol_shocks=(0.0,), time_steps=(0.0,), rate_shifts=(0.0,),
+                 r: float = 0.05, q: float = 0.04, max_cells: int = 2_000_000):
+        self.spot_shocks = np.asarray(spot_shocks, dtype=float)
+        self.vol_shocks = np.asarray(vol_shocks, dtype=float)
+        self.time_steps = np.asarray(time_steps, dtype=float)
+        self.rate_shifts = np.asarray(rate_shifts, dtype=float)
+        self.r = r
+        self.q = q
+        self.max_cells = max_cells
+
+    def scenarios(self) -> pd.DataFrame:
+        """
+        :return: one row per scenario (Spot shock, Vol shock, Time step, Rate shift)
+        """
+        grid = np.meshgrid(self.spot_shocks, self.vol_shocks, self.time_steps, self.rate_shifts, indexing='ij')
+        return pd.DataFrame({name: g.ravel() for name, g in
+                             zip(['Spot shock', 'Vol shock', 'Time step', 'Rate shift'], grid)})
+
+    def run(self, data: pd.DataFrame, quantity=None, valuation: ValuationDate = None) -> dict:
+        """
+        :param data: dataframe from Options.get_option (Ticker, Spot, Maturity, Type, Strike, Volatility)
+        :param quantity: number of contracts held per row (1 by default)
+        :param valuation: valuation date and day count, ValuationDate() by default
+        :return: dict with 'portfolio' (P&L and Greeks per scenario) and 'ticker' (per scenario and ticker) dataframes
+        """
+        strike, spot, t, sigma, is_call = Options.batch_inputs(data, valuation)
+        quantity = np.broadcast_to(np.asarray(1.0 if quantity is None else quantity, dtype=float), strike.shape)
+        base = Options(strike, spot, t, sigma, self.r, self.q).greeks(is_call).price
+
+        # tickers as integer codes to aggregate with bincount
+        codes, tickers = pd.factorize(data['Ticker'])
+        n_tickers = len(tickers)
+
+        scenarios = self.scenarios()
+        shocks = scenarios.to_numpy()
+        fields = ['P&L'] + [f.capitalize() for f in Greeks._fields[1:]]
+        per_ticker = np.zeros((len(shocks), len(fields), n_tickers))
+
+        step = max(self.max_cells // max(len(strike), 1), 1)
+        for start in range(0, len(shocks), step):
+            chunk = shocks[start:start + step]
+            ds, dv, dt, dr = (chunk[:, [i]] for i in range(4))
+            # shape (scenarios in the chunk, contracts)
+            res = Options(strike, spot * (1 + ds), np.maximum(t - dt, 1e-10), np.maximum(sigma + dv, 1e-6),
+                          self.r + dr, self.q).greeks(is_call)
+            values = [res.price - base, res.delta, res.gamma, res.vega, res.theta]
+
+            # sum per ticker: offset the ticker codes of each scenario row and bincount once per field
+            offsets = (np.arange(len(chunk))[:, None] * n_tickers + codes).ravel()
+            for f, v in enumerate(values):
+                per_ticker[start:start + len(chunk), f] = np.bincount(
+                    offsets, weights=(v * quantity).ravel(), minlength=len(chunk) * n_tickers).reshape(len(chunk), -1)
+
+        portfolio = scenarios.assign(**dict(zip(fields, per_ticker.sum(axis=2).T)))
+        ticker = pd.DataFrame({
+            'Scenario': np.repeat(np.arange(len(shocks)), n_tickers),
+            'Ticker': np.tile(np.asarray(tickers), len(shocks)),
+            **{f: per_ticker[:, i, :].ravel() for i, f in enumerate(fields)}
+        })
+        return {'portfolio': portfolio, 'ticker': ticker}
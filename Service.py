@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from Option import Greeks, Options
+
+# columns of a pricing request, t in year fractions
+INPUTS = ['strike', 'spot', 't', 'sigma']
+
+
+class PricingService:
+    """
+    Local HTTP/JSON pricing service (asyncio, HTTP/1.1 keep-alive)
+    POST /price with columns {"strike": [...], "spot": [...], "t": [...], "sigma": [...], "type": [...], "r": 0.05,
+    "q": 0.04} (scalars are broadcast) returns {"price": [...], "delta": [...], "gamma": [...], "vega": [...],
+    "theta": [...]}. GET /stats returns the latency percentiles and the throughput, GET /health returns ok.
+    Concurrent requests are coalesced into micro-batches: the first waiting request opens a batch, which is priced
+    with one Options.greeks call once max_batch contracts are queued or max_wait seconds have passed
+    Attributes
+    ==========
+    host: interface of the server
+    port: port of the server (0 picks a free port)
+    max_batch: maximum number of contracts per batch
+    max_wait: maximum time in seconds a request waits for other requests to join its batch
+    r: default risk-free rate of the requests
+    q: default dividend yield of the requests
+
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, max_batch: int = 4096, max_wait: float = 0.002,
+                 r: float = 0.05, q: float = 0.04, history: int = 100_000):
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.r = r
+        self.q = q
+        self.requests = 0
+        self.contracts = 0
+        self.batches = 0
+        self.started = None
+
+        # private
+        self._queue = None
+        self._server = None
+        self._batcher = None
+        self._latencies = deque(maxlen=history)
+
+    def parse(self, body: dict) -> np.ndarray:
+        """
+        :param body: json request
+        :return: array (7, n) of strike, spot, t, sigma, is_call, r and q
+        """
+        columns = [body[name] for name in INPUTS]
+        option_type = np.char.upper(np.asarray(body.get('type', 'CALL'), dtype=str))
+        if not np.isin(option_type, ['CALL', 'PUT']).all():
+            raise ValueError("Option type should be either CALL or PUT")
+        columns += [option_type == 'CALL', body.get('r', self.r), body.get('q', self.q)]
+        columns = [np.atleast_1d(np.asarray(c, dtype=float)) for c in columns]
+        if any(c.ndim > 1 for c in columns):
+            raise ValueError("Every column should be a number or a flat list")
+        return np.array(np.broadcast_arrays(*columns))
+
+    async def price(self, inputs: np.ndarray) -> Greeks:
+        """
+        Queue the contracts of one request and wait for the batch they end up in
+        :param inputs: array from parse
+        :return: Greeks record of arrays
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((inputs, future))
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # nothing may end the loop, every later request would wait forever; the futures of the clients that
+            # went away are already cancelled
+            try:
+                size = batch[0][0].shape[1]
+                deadline = loop.time() + self.max_wait
+                while size < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                    size += batch[-1][0].shape[1]
+
+                inputs = np.concatenate([b[0] for b in batch], axis=1)
+                strike, spot, t, sigma, is_call, r, q = inputs
+                with np.errstate(all='ignore'):
+                    res = np.array(Options(strike, spot, t, sigma, r, q).greeks(is_call.astype(bool)))
+
+                self.batches += 1
+                start = 0
+                for request, future in batch:
+                    stop = start + request.shape[1]
+                    if not future.done():
+                        future.set_result(Greeks(*res[:, start:stop]))
+                    start = stop
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self._route(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple:
+        if method == 'GET' and path == '/health':
+            return '200 OK', {'status': 'ok'}
+        if method == 'GET' and path == '/stats':
+            return '200 OK', self.stats()
+        if method != 'POST' or path != '/price':
+            return '404 Not Found', {'error': f"{method} {path} not found"}
+
+        start = time.perf_counter()
+        try:
+            inputs = self.parse(json.loads(body))
+        except (KeyError, ValueError, TypeError) as e:
+            return '400 Bad Request', {'error': f"Invalid request: {e}"}
+        try:
+            res = await self.price(inputs)
+        except Exception as e:
+            return '500 Internal Server Error', {'error': f"Pricing failed: {e}"}
+        payload = {name: np.where(np.isfinite(values), values, None).tolist()
+                   for name, values in zip(Greeks._fields, res)}
+        self._latencies.append(time.perf_counter() - start)
+        self.requests += 1
+        self.contracts += inputs.shape[1]
+        return '200 OK', payload
+
+    def stats(self) -> dict:
+        """
+        :return: requests, contracts, batches, mean batch size, throughput since the start and latency percentiles
+        (in milliseconds, last `history` requests)
+        """
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        latencies = np.array(self._latencies) * 1000
+        percentiles = {f"p{p}": float(np.percentile(latencies, p)) if latencies.size else None for p in (50, 90, 99)}
+        return {'requests': self.requests, 'contracts': self.contracts, 'batches': self.batches,
+                'mean_batch': self.contracts / self.batches if self.batches else 0.0,
+                'requests_per_s': self.requests / elapsed if elapsed else 0.0,
+                'contracts_per_s': self.contracts / elapsed if elapsed else 0.0,
+                'latency_ms': {**percentiles, 'max': float(latencies.max()) if latencies.size else None}}
+
+    async def start(self):
+        """
+        Start listening, self.port holds the real port afterwards
+        """
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.started = time.perf_counter()
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Pricing service on http://{self.host}:{self.port} (max batch {self.max_batch}, "
+              f"max wait {self.max_wait * 1000:g} ms)", file=sys.stderr)
+        async with self._server:
+            await self._server.serve_forever()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON BSM pricing service with micro-batching")
+    parser.add_argument('--host', default='127.0.0.1', help="interface to listen on")
+    parser.add_argument('--port', type=int, default=8765, help="port to listen on")
+    parser.add_argument('--max-batch', type=int, default=4096, help="maximum contracts per batch")
+    parser.add_argument('--max-wait', type=float, default=2.0, help="maximum wait for a batch to fill (ms)")
+    args = parser.parse_args(argv)
+
+    service = PricingService(args.host, args.port, args.max_batch, args.max_wait / 1000)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+# pandas is only needed for whole columns, one maturity (GUI pricer) is converted without it
+if TYPE_CHECKING:
+    import pandas as pd
+
+# day count convention -> days in one year
+DAY_COUNTS = {'ACT/365': 365.0, 'ACT/360': 360.0, 'BUS/252': 252.0}
+
+
+class ValuationDate:
+    """
+    One pinned valuation instant for a whole run and the conversion of maturities to year fractions
+    Attributes
+    ==========
+    now: valuation instant, datetime.now() when the object is created by default
+    day_count: ACT/365, ACT/360 (actual time, not truncated to whole days) or BUS/252 (business days)
+    holidays: dates skipped by the business day count
+
+    """
+
+    def __init__(self, now: datetime = None, day_count: str = 'ACT/365', holidays: list = None):
+        if day_count not in DAY_COUNTS:
+            raise ValueError(f"Unknown day count {day_count}, use one of {', '.join(DAY_COUNTS)}")
+        self.now = now or datetime.now()
+        self.day_count = day_count
+        self.holidays = holidays or []
+
+        # private: maturity -> year fraction, the listed expiries repeat a lot
+        self._cache = {}
+
+    def _fractions(self, maturities: pd.DatetimeIndex) -> np.ndarray:
+        import pandas as pd
+
+        if self.day_count == 'BUS/252':
+            days = np.busday_count(np.datetime64(self.now.date()), maturities.values.astype('datetime64[D]'),
+                                   holidays=self.holidays)
+            return days / DAY_COUNTS[self.day_count]
+        seconds = (maturities - pd.Timestamp(self.now)).total_seconds().to_numpy()
+        return seconds / (86400 * DAY_COUNTS[self.day_count])
+
+    def year_fractions(self, maturities, fmt: str = '%Y-%m-%d') -> np.ndarray:
+        """
+        Convert a whole maturity column, each distinct maturity is parsed once and kept for the next calls
+        :param maturities: column of dates (text in fmt or datetime64)
+        :param fmt: format of the text dates
+        :return: float array of times to maturity (in year fractions), nan for missing maturities
+        """
+        import pandas as pd
+
+        codes, uniques = pd.factorize(pd.Series(maturities))
+        missing = [m for m in uniques if m not in self._cache]
+        if missing:
+            dates = pd.DatetimeIndex(pd.to_datetime(pd.Series(missing), format=None if isinstance(
+                missing[0], (datetime, np.datetime64)) else fmt))
+            self._cache.update(zip(missing, self._fractions(dates)))
+
+        # code -1 (missing maturity) picks the trailing nan
+        values = np.array([self._cache[m] for m in uniques] + [np.nan])
+        return values[codes]
+
+    def year_fraction(self, maturity, fmt: str = '%Y-%m-%d') -> float:
+        """
+        Same result as year_fractions for a single maturity, without importing pandas
+        :param maturity: one date (text in fmt or datetime)
+        :param fmt: format of the text date
+        :return: time to maturity (in year fractions)
+        """
+        if maturity not in self._cache:
+            date = maturity if isinstance(maturity, datetime) else datetime.strptime(maturity, fmt)
+            if self.day_count == 'BUS/252':
+                fraction = np.busday_count(self.now.date(), date.date(), holidays=self.holidays) / DAY_COUNTS[
+                    self.day_count]
+            else:
+                fraction = (date - self.now).total_seconds() / (86400 * DAY_COUNTS[self.day_count])
+            self._cache[maturity] = fraction
+        return float(self._cache[maturity])
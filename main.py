@@ -1,4 +1,10 @@
-from Interface import App
+import sys
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # headless mode: python main.py portfolio.csv priced.parquet
+        from Cli import main
+        sys.exit(main())
+
+    from Interface import App
     App()
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from Lattice import BinomialTree
+from Option import Options
+
+
+def quotes(n: int = 200):
+    rng = np.random.default_rng(0)
+    return (rng.uniform(70, 130, n), 100.0, rng.uniform(0.1, 2, n), rng.uniform(0.1, 0.5, n),
+            rng.random(n) < 0.5)
+
+
+def test_european_leisen_reimer_matches_bsm():
+    strike, spot, t, sigma, is_call = quotes()
+    tree = BinomialTree(steps=501, method='LR', american=False).greeks(strike, spot, t, sigma, is_call)
+    exact = Options(strike, spot, t, sigma, 0.05, 0.04).greeks(is_call)
+    np.testing.assert_allclose(tree.price, exact.price, atol=1e-4)
+    np.testing.assert_allclose(tree.delta, exact.delta, atol=1e-3)
+    np.testing.assert_allclose(tree.gamma, exact.gamma, atol=1e-3)
+    np.testing.assert_allclose(tree.theta, exact.theta, atol=1e-3)
+
+
+def test_american_put_is_worth_at_least_the_european():
+    strike, spot, t, sigma, _ = quotes()
+    american = BinomialTree(steps=201, method='LR').price(strike, spot, t, sigma, False)
+    european = BinomialTree(steps=201, method='LR', american=False).price(strike, spot, t, sigma, False)
+    assert (american >= european - 1e-12).all()
+
+
+@pytest.mark.parametrize('steps', [1, 2])
+def test_too_few_steps_are_rejected(steps):
+    with pytest.raises(ValueError):
+        BinomialTree(steps=steps, method='CRR')
@@ -0,0 +1,27 @@
+import pytest
+
+from MonteCarlo import MonteCarloPricer
+from Option import Options
+
+
+@pytest.mark.parametrize('option_type', ['CALL', 'PUT'])
+def test_european_estimate_brackets_bsm(option_type):
+    strike, spot, t, sigma = 105.0, 100.0, 0.7, 0.25
+    exact = float(Options(strike, spot, t, sigma, 0.05, 0.04).greeks(option_type).price)
+    # 99.9% interval so a fixed seed is not a coin flip
+    res = MonteCarloPricer(paths=200_000, chunk_paths=50_000, seed=1, confidence=0.999).price(
+        strike, spot, t, sigma, option_type)
+    assert res.ci_low <= exact <= res.ci_high
+    assert res.std_error < 0.01
+
+
+def test_result_does_not_depend_on_the_workers():
+    args = 100.0, 100.0, 1.0, 0.2, 'CALL'
+    serial = MonteCarloPricer(paths=40_000, chunk_paths=10_000, workers=1).price(*args)
+    pooled = MonteCarloPricer(paths=40_000, chunk_paths=10_000, workers=2).price(*args)
+    assert serial.price == pooled.price
+
+
+def test_odd_paths_are_rejected_with_antithetic():
+    with pytest.raises(ValueError):
+        MonteCarloPricer(paths=200_001)
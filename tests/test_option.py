@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from Option import Options
+
+R, Q = 0.05, 0.04
+QUOTES = [(100.0, 100.0, 1.0, 0.2), (80.0, 100.0, 0.25, 0.35), (130.0, 100.0, 2.0, 0.15), (95.0, 110.0, 0.5, 0.6)]
+
+
+def price(strike, spot, t, sigma, option_type):
+    return float(Options(strike, spot, t, sigma, R, Q).greeks(option_type).price)
+
+
+@pytest.mark.parametrize('option_type', ['CALL', 'PUT'])
+@pytest.mark.parametrize('strike, spot, t, sigma', QUOTES)
+def test_greeks_match_finite_differences(strike, spot, t, sigma, option_type):
+    res = Options(strike, spot, t, sigma, R, Q).greeks(option_type)
+    h_s, h_v, h_t = 1e-4 * spot, 1e-4, 1e-5
+
+    up, down = price(strike, spot + h_s, t, sigma, option_type), price(strike, spot - h_s, t, sigma, option_type)
+    mid = price(strike, spot, t, sigma, option_type)
+    assert res.delta == pytest.approx((up - down) / (2 * h_s), rel=1e-5, abs=1e-9)
+    assert res.gamma == pytest.approx((up - 2 * mid + down) / h_s ** 2, rel=1e-4, abs=1e-7)
+
+    # vega per 1% of volatility
+    vega = (price(strike, spot, t, sigma + h_v, option_type) - price(strike, spot, t, sigma - h_v, option_type)) / (
+        2 * h_v) / 100
+    assert res.vega == pytest.approx(vega, rel=1e-5, abs=1e-9)
+
+    # theta per calendar day, the option loses time to maturity
+    theta = -(price(strike, spot, t + h_t, sigma, option_type) - price(strike, spot, t - h_t, sigma, option_type)) / (
+        2 * h_t) / 365
+    assert res.theta == pytest.approx(theta, rel=1e-5, abs=1e-9)
+
+
+def test_scalar_and_array_results_agree():
+    strike, spot, t, sigma = (np.array(x) for x in zip(*QUOTES))
+    is_call = np.array([True, False, True, False])
+    batch = Options(strike, spot, t, sigma, R, Q).greeks(is_call)
+    for i in range(len(strike)):
+        scalar = Options(strike[i], spot[i], t[i], sigma[i], R, Q).greeks('CALL' if is_call[i] else 'PUT')
+        for name in scalar._fields:
+            assert getattr(batch, name)[i] == pytest.approx(float(getattr(scalar, name)), rel=1e-12, abs=1e-15)
+
+
+def test_scalar_methods_match_the_kernel():
+    op = Options(100.0, 100.0, 1.0, 0.2, R, Q)
+    res = op.greeks('CALL').round()
+    assert op.bsm('CALL') == res.price
+    assert op.delta('CALL') == res.delta
+    assert op.gamma() == res.gamma
+    assert op.vega() == res.vega
+    assert op.theta('CALL') == res.theta
+
+
+def test_implied_volatility_round_trip():
+    rng = np.random.default_rng(0)
+    n = 2_000
+    strike, t, sigma = rng.uniform(60, 140, n), rng.uniform(0.05, 3, n), rng.uniform(0.05, 1.5, n)
+    is_call = rng.random(n) < 0.5
+    quotes = Options(strike, 100.0, t, sigma, R, Q).greeks(is_call).price
+    # quotes without time value (deep in the money, short maturity) do not identify the volatility
+    vega = Options(strike, 100.0, t, sigma, R, Q).greeks(is_call).vega
+    sensible = vega > 1e-3
+
+    res = Options.implied_volatility(quotes, strike, 100.0, t, is_call, r=R, q=Q)
+    assert not res.not_converged[sensible].any()
+    np.testing.assert_allclose(res.sigma[sensible], sigma[sensible], rtol=1e-6, atol=1e-6)
+
+
+def test_implied_volatility_rejects_unknown_option_type():
+    with pytest.raises(ValueError):
+        Options.implied_volatility(10.0, 100.0, 100.0, 1.0, 'STRADDLE')
@@ -0,0 +1,19 @@
+import numpy as np
+
+from Option import Options
+from Parallel import ParallelPricer
+
+
+def test_parallel_pricer_equals_serial_kernel():
+    rng = np.random.default_rng(0)
+    n = 10_001
+    strike, spot = rng.uniform(50, 150, n), rng.uniform(80, 120, n)
+    t, sigma = rng.uniform(0.05, 3, n), rng.uniform(0.05, 1.0, n)
+    is_call = rng.random(n) < 0.5
+
+    serial = Options(strike, spot, t, sigma, 0.05, 0.04).greeks(is_call)
+    # small tasks so the slices are spread over both processes, the last one partial
+    with ParallelPricer(workers=2, chunksize=3_000) as pricer:
+        parallel = pricer.greeks(strike, spot, t, sigma, is_call, r=0.05, q=0.04)
+    for a, b in zip(serial, parallel):
+        np.testing.assert_array_equal(a, b)
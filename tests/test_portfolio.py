@@ -0,0 +1,20 @@
+import numpy as np
+
+from Option import Options
+from Portfolio import Portfolio
+from Provider import SyntheticProvider
+
+
+def full_reprice(portfolio: Portfolio):
+    return Options(portfolio.strike, portfolio.spot, portfolio.t, portfolio.sigma, portfolio.r,
+                   portfolio.q).greeks(portfolio.is_call)
+
+
+def test_incremental_updates_match_a_full_reprice():
+    portfolio = Portfolio(SyntheticProvider(n_tickers=20, start='2030-01-01').portfolio(5_000))
+    touched = portfolio.update(spots={'SYN0001': 123.4, 'SYN0002': 50.0}, vol_shifts={'SYN0003': 0.02})
+    portfolio.update(vols={'SYN0004': 0.5})
+
+    assert set(touched) == set(np.concatenate([portfolio.rows(t) for t in ('SYN0001', 'SYN0002', 'SYN0003')]))
+    for cached, exact in zip(portfolio.results, full_reprice(portfolio)):
+        np.testing.assert_allclose(cached, exact, rtol=1e-10, atol=1e-12)
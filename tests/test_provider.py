@@ -0,0 +1,24 @@
+import pytest
+
+from Provider import CachedProvider, MarketDataProvider, SyntheticProvider, YahooProvider
+
+
+def test_incomplete_provider_fails_when_constructed():
+    class NoChain(MarketDataProvider):
+        def retrieve_ticker(self):
+            return []
+
+        def get_spot(self, ticker_list):
+            return 0.0
+
+        def maturities(self, ticker):
+            return []
+
+    with pytest.raises(TypeError):
+        NoChain()
+
+
+def test_providers_implement_the_interface():
+    SyntheticProvider()
+    YahooProvider()
+    CachedProvider(SyntheticProvider(), cache=None)
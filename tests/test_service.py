@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+import numpy as np
+
+from Option import Options
+from Service import PricingService
+
+GOOD = {'strike': [90.0, 100.0], 'spot': 100.0, 't': [0.5, 1.0], 'sigma': 0.2, 'type': ['CALL', 'PUT']}
+
+
+async def call(port: int, body: dict) -> tuple:
+    """
+    :return: status code and json response of one POST /price on a new connection
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        data = json.dumps(body).encode()
+        writer.write(f"POST /price HTTP/1.1\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while (line := await reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        return status, json.loads(await reader.readexactly(length))
+    finally:
+        writer.close()
+
+
+async def scenario() -> list:
+    service = PricingService(port=0, max_wait=0.05)
+    await service.start()
+    try:
+        first = await call(service.port, GOOD)
+        # the malformed request waits in the same batch window as the good one
+        malformed, good = await asyncio.gather(
+            call(service.port, {**GOOD, 'strike': [[100.0, 110.0]]}),
+            call(service.port, GOOD))
+        # contracts that break the batch itself fail their request (500), the batcher keeps running
+        broken = await asyncio.gather(service.price(np.zeros((6, 2))), return_exceptions=True)
+        last = await call(service.port, GOOD)
+        return [first, malformed, good, broken[0], last, service._batcher.done()]
+    finally:
+        await service.stop()
+
+
+def test_service_survives_malformed_requests():
+    first, malformed, good, broken, last, batcher_done = asyncio.run(asyncio.wait_for(scenario(), 10))
+    exact = Options(np.array([90.0, 100.0]), 100.0, np.array([0.5, 1.0]), 0.2, 0.05, 0.04).greeks(
+        np.array([True, False]))
+
+    assert malformed[0] == 400
+    assert isinstance(broken, Exception)
+    assert not batcher_done
+    for status, payload in (first, good, last):
+        assert status == 200
+        np.testing.assert_allclose(payload['price'], exact.price)
+        np.testing.assert_allclose(payload['gamma'], exact.gamma)